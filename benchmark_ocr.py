@@ -0,0 +1,95 @@
+"""
+OCR benchmark: per-tier hit rates, readtext calls, time and agreement with the known date,
+for the checked-in samples (tests/test_samples_OCR) and a real batch of postimg images whose
+date was found by an earlier OCR run. Four ways of running the OCR are compared:
+  full        the whole image at full resolution only (the default, both tiers off)
+  roi         top/bottom strips first, full image as fallback (ROI_TIER = True)
+  digits      digits-only strips first, full image as fallback (DIGITS_TIER = True)
+  digits+roi  both tiers in front of the full image
+
+Needs easyocr and its models (downloaded on first use) and network access for the real batch.
+
+Usage: python3 benchmark_ocr.py [csv] [images]   (default: russian_losses_with_dates.csv 50)
+"""
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+from PIL import Image
+import date_extracting_from_image_using_OCR as ocr
+from dataset_store import date_states, load_losses
+from extract_from_links_with_dates import extract_dates_from_postimg_link_strings
+from extract_images_from_postimg import load_postimg_array_with_hash
+
+SAMPLES = {
+    "samples_easy/test_image_1.jpg": "14-06-2022",
+    "slashes/slashes_1.png": "24-02-2022",
+}
+# mode -> (DIGITS_TIER, ROI_TIER)
+MODES = {"full": (False, False), "roi": (False, True), "digits": (True, False), "digits+roi": (True, True)}
+
+
+def run_mode(mode, images):
+    """(results, seconds, readtext calls) of one mode over the images, one image per call like the pipeline's batches of 1."""
+    reader = ocr.get_reader()
+    calls = Counter()
+    single, batched = reader.readtext, reader.readtext_batched
+
+    def count(name, method):
+        def counted(*args, **kwargs):
+            calls[name] += 1
+            return method(*args, **kwargs)
+        return counted
+
+    with mock.patch.object(reader, "readtext", count("readtext", single)), \
+         mock.patch.object(reader, "readtext_batched", count("readtext_batched", batched)), \
+         mock.patch.object(ocr, "DIGITS_TIER", MODES[mode][0]), \
+         mock.patch.object(ocr, "ROI_TIER", MODES[mode][1]):
+        start = time.perf_counter()
+        results = [ocr.extract_dates_and_tiers_from_image_batch([img])[0] for img in images]
+        seconds = time.perf_counter() - start
+    return results, seconds, sum(calls.values())
+
+
+def report(title, images, expected):
+    print(f"\n{title}: {len(images)} images")
+    for mode in MODES:
+        results, seconds, calls = run_mode(mode, images)
+        tiers = Counter(tier for _, tier in results)
+        agree = sum(date == known for (date, _), known in zip(results, expected))
+        differ = sum(date is not None and date != known for (date, _), known in zip(results, expected))
+        hit_rates = ", ".join(f"{tier} {tiers[tier] / len(images):.0%}" for tier in
+                              (ocr.TIER_DIGITS, ocr.TIER_ROI, ocr.TIER_FULL, ocr.TIER_NONE) if tiers[tier])
+        print(f"  {mode:<10} {seconds:7.1f} s | {calls:3d} readtext calls | "
+              f"same date {agree}, other date {differ}, none {tiers[ocr.TIER_NONE]} | {hit_rates}")
+
+
+def real_batch(csv_path, n):
+    """Decoded images and stored dates of n postimg rows dated by OCR (no date in the link, not manual)."""
+    df = load_losses(csv_path)
+    postimg = df[(df["link_type"] == "postimg") & (date_states(df) == "found")]
+    ocr_dated = postimg[extract_dates_from_postimg_link_strings(postimg["link"]).isna()]
+    sample = ocr_dated.drop_duplicates("link").sample(min(n, len(ocr_dated)), random_state=0)
+    images, expected = [], []
+    for link, date in zip(sample["link"], sample["date"]):
+        array, _ = load_postimg_array_with_hash(link)
+        if array is not None:
+            images.append(array)
+            expected.append(date)
+    return images, expected
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "russian_losses_with_dates.csv"
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    start = time.perf_counter()
+    ocr.get_reader()
+    print(f"EasyOCR reader loaded in {time.perf_counter() - start:.1f} s")
+
+    base = Path(__file__).parent / "tests" / "test_samples_OCR"
+    report("checked-in samples", [Image.open(base / name) for name in SAMPLES], list(SAMPLES.values()))
+
+    images, expected = real_batch(csv_path, n)
+    report(f"real batch from {csv_path}", images, expected)
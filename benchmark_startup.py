@@ -0,0 +1,73 @@
+"""
+Startup benchmark: how long `import main` takes and how fast the non-OCR date stages run,
+and proof that torch / cv2 / easyocr are not loaded unless an image actually needs OCR.
+
+Usage: python3 benchmark_startup.py [csv]   (default: russian_losses_with_dates.csv)
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ("torch", "cv2", "easyocr")
+REPEATS = 5
+
+
+def run_python(code):
+    """Run code in a fresh interpreter (cold imports) and return (seconds, stdout)."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stdout.strip()
+
+
+def heavy_loaded_after(code):
+    _, out = run_python(code + f"\nimport sys; print('HEAVY:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    return [line for line in out.splitlines() if line.startswith("HEAVY:")][-1][len("HEAVY:"):]
+
+
+def slowest_imports(module, top=8):
+    """Top cumulative import times from python -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def non_ocr_stage_csv(source_csv, target_csv):
+    """Copy the dataset with dates blanked for rows the non-OCR stages can fill (Twitter + dated postimg links)."""
+    import pandas as pd
+    from extract_from_links_with_dates import extract_dates_from_postimg_link_strings
+
+    df = pd.read_csv(source_csv)
+    twitter = df["link_type"] == "twitter"
+    dated_link = extract_dates_from_postimg_link_strings(df["link"]).notna()
+    df.loc[(twitter | dated_link) & ~df["manually_changed"], "date"] = ""
+    df.to_csv(target_csv, index=False)
+    return int(((twitter | dated_link) & ~df["manually_changed"]).sum())
+
+
+if __name__ == "__main__":
+    source_csv = sys.argv[1] if len(sys.argv) > 1 else "russian_losses_with_dates.csv"
+
+    times = [run_python("import main")[0] for _ in range(REPEATS)]
+    print(f"import main: best {min(times) * 1000:.0f} ms of {REPEATS} cold starts (incl. interpreter)")
+    print(f"heavy modules loaded by `import main`: {heavy_loaded_after('import main') or 'none'}")
+    print("slowest imports (cumulative, us):")
+    for cumulative, name in slowest_imports("main"):
+        print(f"  {cumulative:>9}  {name}")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "non_ocr.csv")
+        blanked = non_ocr_stage_csv(source_csv, csv_path)
+        code = f"from extract_dates import extract_dates\nextract_dates({csv_path!r}, logger=None)"
+        seconds, _ = run_python(code)
+        print(f"non-OCR date stages on {blanked} rows of {source_csv}: {seconds:.2f} s (incl. startup)")
+        print(f"heavy modules loaded by the non-OCR stages: {heavy_loaded_after(code) or 'none'}")
@@ -0,0 +1,74 @@
+"""
+Storage benchmark: load time, in-memory size and file size of each dataset as CSV and as
+the typed Parquet store (see dataset_store), and what the stages' loader (load_losses) costs.
+Also times the per-stage date masks: derived from the date strings vs. the date_state column.
+
+Usage: python3 benchmark_store.py [csv ...]   (default: both *_losses_with_dates.csv)
+"""
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+from dataset_store import load_losses, read_losses, read_losses_typed, store_path_for, write_losses
+
+DEFAULT_CSVS = ("russian_losses_with_dates.csv", "ukrainian_losses_with_dates.csv")
+REPEATS = 5
+
+
+def best_time(load):
+    """Best of REPEATS wall times of load(), and its last result."""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        df = load()
+        times.append(time.perf_counter() - start)
+    return min(times), df
+
+
+def megabytes(n_bytes):
+    return n_bytes / 1024 ** 2
+
+
+def string_masks(df):
+    """The missing / NO_DATE_FOUND / open masks as the stages derived them from the date text."""
+    missing = (df["date"].isna() | (df["date"].astype(str).str.strip() == "")) & ~df["manually_changed"]
+    no_date = df["date"].astype(str).str.upper() == "NO_DATE_FOUND"
+    return missing, no_date, missing | no_date
+
+
+def state_masks(df):
+    """The same masks from the date_state column of load_losses."""
+    states = df["date_state"]
+    return states == "missing", states == "no_date_found", states.isin(["missing", "no_date_found"])
+
+
+if __name__ == "__main__":
+    csv_paths = sys.argv[1:] or DEFAULT_CSVS
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for csv_path in csv_paths:
+            store = os.path.join(tmpdir, os.path.basename(store_path_for(csv_path, "parquet")))
+            write_losses(pd.read_csv(csv_path), store)
+
+            print(f"\n{csv_path}")
+            rows = [
+                ("csv (read_csv)", csv_path, lambda: pd.read_csv(csv_path)),
+                ("parquet, typed", store, lambda: read_losses_typed(store)),
+                ("parquet, csv layout", store, lambda: read_losses(store)),
+                ("csv, load_losses", csv_path, lambda: load_losses(csv_path)),
+                ("parquet, load_losses", store, lambda: load_losses(store)),
+            ]
+            for label, path, load in rows:
+                seconds, df = best_time(load)
+                memory = df.memory_usage(deep=True).sum()
+                print(
+                    f"  {label:<20} load {seconds * 1000:7.1f} ms | memory {megabytes(memory):6.2f} MB | "
+                    f"file {megabytes(os.path.getsize(path)):5.2f} MB"
+                )
+
+            csv_df, loaded = pd.read_csv(csv_path), load_losses(csv_path)
+            for label, masks in (("masks from date strings", lambda: string_masks(csv_df)),
+                                 ("masks from date_state", lambda: state_masks(loaded))):
+                seconds, _ = best_time(masks)
+                print(f"  {label:<24} {seconds * 1000:7.2f} ms")
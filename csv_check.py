@@ -1,27 +1,19 @@
-import pandas as pd
-import re
 import os
+from dataset_store import NO_DATE_FOUND, date_states, load_losses
+from date_normalization import invalid_date_reasons, parse_dates
 
 def date_year_distribution(df):
     """Compute percentage of rows for each year based on 'date' column (dd-mm-yyyy).  
-    Ignores empty dates, 'NO_DATE_FOUND', and any invalid formats.
+    Ignores empty dates, 'NO_DATE_FOUND', and any invalid dates (see date_normalization).
     """
-    valid_dates = []
-    for date_str in df['date'].dropna().astype(str):
-        date_str = date_str.strip()
-        if not date_str or date_str.upper() == "NO_DATE_FOUND":
-            continue
-        if re.match(r"^\d{2}-\d{2}-\d{4}$", date_str):
-            day, month, year = map(int, date_str.split("-"))
-            if 1 <= day <= 31 and 1 <= month <= 12 and 2022 <= year <= 2025:
-                valid_dates.append(year)
-
-    if not valid_dates:
+    years = parse_dates(df['date']).dropna().dt.year
+
+    if years.empty:
         print("\nNo valid dates found for year distribution.")
         return
 
-    year_counts = pd.Series(valid_dates).value_counts().sort_index()
-    total = len(valid_dates)
+    year_counts = years.value_counts().sort_index()
+    total = len(years)
     year_percentages = (year_counts / total * 100).round(2)
 
     print("\nDate distribution by year (percentage of valid rows with date):")
@@ -49,18 +41,15 @@ def count_link_types(df):
 
 def count_link_types_no_date(df):
     """Count link types only for rows with missing or empty dates."""
-    missing_date = (
-        df['date'].isna()
-        | (df['date'].astype(str).str.strip() == "")
-        | (df['date'].astype(str).str.upper() == "NO_DATE_FOUND")
-    )
+    missing_date = date_states(df).isin(["missing", "no_date_found"])
     print("\nLink types for rows with missing dates:")
-    print(df.loc[missing_date, 'link_type'].value_counts())
+    counts = df.loc[missing_date, 'link_type'].value_counts()
+    print(counts[counts > 0])
 
 
 def count_no_date_found(df):
-    """Count rows where date equals exactly 'NO_DATE_FOUND'."""
-    count = (df["date"].astype(str).str.upper() == "NO_DATE_FOUND").sum()
+    """Count rows where date equals exactly 'NO_DATE_FOUND' (manually changed rows not included)."""
+    count = (date_states(df) == "no_date_found").sum()
     print(f"\nRows where date = 'NO_DATE_FOUND': {count}")
 
 
@@ -71,10 +60,10 @@ def inspect_manually_changed(df):
     """
 
     if "manually_changed" not in df.columns:
-        print(f"⚠️ Column 'manually_changed' not found")
+        print("⚠️ Column 'manually_changed' not found")
         return
 
-    print(f"\nInspecting 'manually_changed' column in")
+    print("\nInspecting 'manually_changed' column in")
 
     # Show counts of exact values
     print("\nValue counts:")
@@ -90,7 +79,7 @@ def list_no_date_found_entries(df):
     Print index and link of rows where date == 'NO_DATE_FOUND'.
     Ask user if they want to save these rows to NO_DATE_FOUND.csv.
     """
-    mask = df["date"].astype(str).str.upper() == "NO_DATE_FOUND"
+    mask = date_states(df) == "no_date_found"
     no_date_rows = df.loc[mask, ["link"]]
 
     if no_date_rows.empty:
@@ -119,35 +108,25 @@ def list_no_date_found_entries(df):
 
 
 def count_dates(df):
-    """Count rows with dates and without dates."""
-    has_date = (
-        df['date'].notna()
-        & (df['date'].astype(str).str.strip() != "")
-        & (df['date'].astype(str).str.upper() != "NO_DATE_FOUND")
-    )
-    print(f"\nRows with date: {has_date.sum()}")
-    print(f"Rows without date: {(~has_date).sum()}")
+    """Count rows with dates, without dates and manually changed."""
+    counts = date_states(df).value_counts()
+    print(f"\nRows with date: {counts['found']}")
+    print(f"Rows without date: {counts['missing'] + counts['no_date_found']}")
+    print(f"Manually changed rows: {counts['manual']}")
     print(f"Total rows: {len(df)}")
 
 
 def validate_dates(df):
-    """Validate date format and logical range. Returns list of invalid entries."""
-    results = []
-    for idx, date_str in df["date"].dropna().items():
-        date_str = str(date_str).strip()
-        if not date_str or date_str.upper() == "NO_DATE_FOUND":
-            continue
-        if not re.match(r"^\d{2}-\d{2}-\d{4}$", date_str):
-            results.append((idx, date_str, "Invalid format", df.loc[idx, "link"]))
-            continue
-        day, month, year = map(int, date_str.split("-"))
-        if not (1 <= day <= 31):
-            results.append((idx, date_str, f"Invalid day: {day}", df.loc[idx, "link"]))
-        elif not (1 <= month <= 12):
-            results.append((idx, date_str, f"Invalid month: {month}", df.loc[idx, "link"]))
-        elif not (2022 <= year <= 2025):
-            results.append((idx, date_str, f"Invalid year: {year}", df.loc[idx, "link"]))
-    return results
+    """
+    Validate date format, calendar and date window (see date_normalization).
+    Returns list of (index, date, reason, link) of the invalid entries.
+    """
+    dated = date_states(df).isin(["found", "manual"]) & df["date"].notna() & (df["date"] != NO_DATE_FOUND)
+    reasons = invalid_date_reasons(df.loc[dated, "date"]).dropna()
+    return [
+        (idx, str(df.at[idx, "date"]).strip(), reason, df.at[idx, "link"])
+        for idx, reason in reasons.items()
+    ]
 
 def equipment_per_category(df):
     """Show number of rows per equipment type within a selected category."""
@@ -232,7 +211,7 @@ def show_menu(df):
 
 if __name__ == "__main__":
     # 🔍 Scan for CSV files in current folder
-    csv_files = [f for f in os.listdir(".") if f.endswith(".csv")]
+    csv_files = [f for f in os.listdir(".") if f.endswith((".csv", ".parquet"))]
     if not csv_files:
         print("No CSV files found in current directory.")
         exit(1)
@@ -249,7 +228,7 @@ if __name__ == "__main__":
         exit(1)
 
     try:
-        df = pd.read_csv(csv_path)
+        df = load_losses(csv_path)
         print(f"\nLoaded {len(df)} rows from '{csv_path}'")
     except FileNotFoundError:
         print(f"File not found: {csv_path}")
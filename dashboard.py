@@ -3,11 +3,12 @@ import plotly.express as px
 import streamlit as st
 import datetime
 import os
+from dataset_store import load_losses
 
 st.title("📊 Losses in the Russo-Ukrainian War")
 
 # --- Step 1: List CSV files ---
-csv_files = [f for f in os.listdir() if f.endswith(".csv") and "NO_DATE_FOUND" not in f]
+csv_files = [f for f in os.listdir() if f.endswith((".csv", ".parquet")) and "NO_DATE_FOUND" not in f]
 
 if not csv_files:
     st.error("No CSV files found in the current folder.")
@@ -17,7 +18,7 @@ if not csv_files:
 dataset_choice = st.selectbox("Choose dataset", csv_files)
 
 # --- Step 3: Load CSV dynamically ---
-df = pd.read_csv(dataset_choice)
+df = load_losses(dataset_choice)
 df["date"] = pd.to_datetime(df["date"], errors="coerce", dayfirst=True)
 df = df.dropna(subset=["date"])
 
@@ -95,7 +96,9 @@ monthly_counts = complete_month_range(filtered, start_date, end_date)
 plot_monthly_chart(monthly_counts, "Losses per Month (Overall)")
 
 # --- Distribution by category ---
-cat_counts = filtered["category"].value_counts().reset_index(name="count")
+category_counts = filtered["category"].value_counts()
+category_counts = category_counts[category_counts > 0]  # categorical: unused categories count 0
+cat_counts = category_counts.reset_index(name="count")
 if not cat_counts.empty:
     max_count = cat_counts["count"].max()
     fig = px.bar(
@@ -113,7 +116,7 @@ if not cat_counts.empty:
     st.plotly_chart(fig)  # remove use_container_width for true dynamic width
 
 # --- Monthly losses per category ---
-category_order = filtered["category"].value_counts().index.tolist()
+category_order = category_counts.index.tolist()
 
 for cat in category_order:
     cat_filtered = filtered[filtered["category"] == cat]
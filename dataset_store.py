@@ -0,0 +1,398 @@
+import argparse
+import json
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# Storage for the loss datasets. The published format is CSV with dd-mm-yyyy date strings.
+# Optionally a dataset is kept in a typed Parquet file instead (pyarrow): categorical
+# equipment_type / category / loss_type / link_type, a real datetime `date` and a boolean
+# `manually_changed`. Or in an SQLite database indexed on link, date and category, where
+# merges insert only new rows and date updates touch single rows in place.
+# read_losses / write_losses pick the format from the file extension and always hand the
+# pipeline the CSV layout, so every stage works on any store.
+COLUMNS = ["equipment_type", "category", "loss_type", "link_type", "link", "date", "manually_changed"]
+CATEGORICAL_COLUMNS = ["equipment_type", "category", "loss_type", "link_type"]
+DATE_FORMAT = "%d-%m-%Y"
+STORE_FORMATS = ("csv", "parquet", "sqlite")
+
+# Date values that are not real dates ("NO_DATE_FOUND", or impossible ones like 31-11-2022
+# read off an image) are kept verbatim in this column of the typed table, so exporting
+# to CSV gives back exactly the original text.
+DATE_TEXT_COLUMN = "date_text"
+
+
+def store_path_for(csv_path, store_format="csv"):
+    """Where a dataset published as `csv_path` is kept for the given store format."""
+    if store_format == "csv":
+        return csv_path
+    return f"{os.path.splitext(csv_path)[0]}.{store_format}"
+
+
+def to_typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a dataset in CSV layout to the typed schema."""
+    typed = pd.DataFrame(index=df.index)
+    for column in CATEGORICAL_COLUMNS:
+        typed[column] = df[column].astype("category")
+    typed["link"] = df["link"].astype("string")
+
+    text = df["date"].astype("string").str.strip()
+    typed["date"] = pd.to_datetime(text, format=DATE_FORMAT, errors="coerce")
+    # Exact text for non-dates; dates that do not round trip (e.g. 1-3-2022) keep their text too
+    round_trips = typed["date"].dt.strftime(DATE_FORMAT) == text
+    typed[DATE_TEXT_COLUMN] = text.where(~round_trips.fillna(False) & text.fillna("").ne(""))
+
+    typed["manually_changed"] = df["manually_changed"].fillna(False).astype(bool)
+    return typed
+
+
+def as_text(values: pd.Series) -> pd.Series:
+    """
+    A text column in CSV layout, with missing values kept missing (NaN). astype("str") would
+    write them as 'nan' / '<NA>' / 'None' on pandas 2.
+    """
+    return values.astype(object).where(values.notna(), np.nan).infer_objects()
+
+
+def format_dates(dates: pd.Series) -> pd.Series:
+    """dd-mm-yyyy strings for a datetime column (NaN for NaT); formats each distinct date once."""
+    codes, uniques = pd.factorize(dates)
+    text = pd.Series(pd.DatetimeIndex(uniques).strftime(DATE_FORMAT), dtype="str")
+    return pd.Series(text.reindex(codes).to_numpy(), index=dates.index, dtype="str")
+
+
+def from_typed(typed: pd.DataFrame, keep_categories=False) -> pd.DataFrame:
+    """
+    Convert a typed dataset back to the CSV layout (dd-mm-yyyy strings, NO_DATE_FOUND, NaN).
+    With keep_categories=True the categorical columns stay categorical (see load_losses).
+    """
+    df = pd.DataFrame(index=typed.index)
+    for column in CATEGORICAL_COLUMNS + ["link"]:
+        keep = keep_categories and column in CATEGORICAL_COLUMNS
+        df[column] = typed[column] if keep else as_text(typed[column])
+    date_text = as_text(typed[DATE_TEXT_COLUMN])
+    df["date"] = date_text.where(date_text.notna(), format_dates(typed["date"]))
+    df["manually_changed"] = typed["manually_changed"].astype(bool)
+    return df
+
+
+# Row ids are the DataFrame index labels of read_losses, so single rows can be updated in place.
+# Dates are stored as their CSV text, which keeps the CSV export identical.
+SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS losses (
+        id INTEGER PRIMARY KEY,
+        equipment_type TEXT,
+        category TEXT,
+        loss_type TEXT,
+        link_type TEXT,
+        link TEXT,
+        date TEXT,
+        manually_changed INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS losses_link ON losses(link);
+    CREATE INDEX IF NOT EXISTS losses_date ON losses(date);
+    CREATE INDEX IF NOT EXISTS losses_category ON losses(category);
+"""
+
+
+def connect_sqlite(path):
+    db = sqlite3.connect(path, timeout=30)
+    db.executescript(SQLITE_SCHEMA)
+    return db
+
+
+def sqlite_rows(df: pd.DataFrame, ids):
+    """(id, *COLUMNS) tuples for an executemany, with NaN as NULL."""
+    values = df[COLUMNS].astype(object).where(df[COLUMNS].notna(), None)
+    values["manually_changed"] = values["manually_changed"].map(lambda v: int(bool(v)))
+    return [(int(i), *row) for i, row in zip(ids, values.itertuples(index=False, name=None))]
+
+
+def read_sqlite(path) -> pd.DataFrame:
+    db = connect_sqlite(path)
+    df = pd.read_sql_query(f"SELECT id, {', '.join(COLUMNS)} FROM losses ORDER BY id", db, index_col="id")
+    db.close()
+    df.index.name = None
+    for column in COLUMNS[:-1]:
+        df[column] = as_text(df[column])  # NULL stays missing, e.g. a date not looked up yet
+    df["manually_changed"] = df["manually_changed"].astype(bool)
+    return df
+
+
+def write_sqlite(df: pd.DataFrame, path):
+    """Replace the whole table; rows get ids 0..n-1 in order."""
+    db = connect_sqlite(path)
+    with db:
+        db.execute("DELETE FROM losses")
+        db.executemany(
+            f"INSERT INTO losses (id, {', '.join(COLUMNS)}) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+            sqlite_rows(df, range(len(df)))
+        )
+    db.close()
+
+
+def insert_new_links(path, df_new: pd.DataFrame):
+    """
+    Append the rows of `df_new` whose link is not in the SQLite store yet, in their order.
+    Only the new rows are written; the link index makes the lookup cheap.
+    Returns (rows added, total rows).
+    """
+    db = connect_sqlite(path)
+    with db:
+        db.execute("CREATE TEMP TABLE recent AS SELECT * FROM losses WHERE 0")
+        db.executemany(
+            f"INSERT INTO recent (id, {', '.join(COLUMNS)}) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+            sqlite_rows(df_new, range(len(df_new)))
+        )
+        added = db.execute(
+            f"INSERT INTO losses ({', '.join(COLUMNS)}) "
+            f"SELECT {', '.join(COLUMNS)} FROM recent "
+            "WHERE NOT EXISTS (SELECT 1 FROM losses WHERE losses.link = recent.link) ORDER BY id"
+        ).rowcount
+        db.execute("DROP TABLE recent")
+        total = db.execute("SELECT COUNT(*) FROM losses").fetchone()[0]
+    db.close()
+    return added, total
+
+
+def update_dates(path, dates: pd.Series):
+    """Set the date of single rows (index = row id) of an SQLite store in place."""
+    values = dates.astype(object).where(dates.notna(), None)
+    db = connect_sqlite(path)
+    with db:
+        db.executemany("UPDATE losses SET date = ? WHERE id = ?", [(v, int(i)) for i, v in values.items()])
+    db.close()
+
+
+def insert_rows(path, rows: pd.DataFrame):
+    """Insert rows at the end of an SQLite store (ids continue after the last row)."""
+    db = connect_sqlite(path)
+    with db:
+        start = db.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM losses").fetchone()[0]
+        db.executemany(
+            f"INSERT INTO losses (id, {', '.join(COLUMNS)}) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+            sqlite_rows(rows, range(start, start + len(rows)))
+        )
+    db.close()
+
+
+# Rows per link of a CSV store, kept in <csv>.links.json so a merge does not have to parse
+# the CSV. The index is stamped with the size and mtime of the CSV it describes; when the
+# CSV was changed by anything else, it is rebuilt from the link column alone.
+def link_index_path_for(csv_path):
+    return f"{csv_path}.links.json"
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def save_link_index(csv_path, counts: dict):
+    with open(link_index_path_for(csv_path), "w", encoding="utf-8") as f:
+        json.dump({"stamp": file_stamp(csv_path), "links": counts}, f)
+
+
+def load_link_index(csv_path):
+    """Link counts from the index of a CSV store, or None if it is missing or stale."""
+    index_path = link_index_path_for(csv_path)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("stamp") != file_stamp(csv_path):
+        return None
+    return index["links"]
+
+
+def link_counts(path) -> dict:
+    """Number of rows per link in a store, without loading the whole dataset."""
+    if path.endswith(".sqlite"):
+        db = connect_sqlite(path)
+        counts = dict(db.execute("SELECT link, COUNT(*) FROM losses GROUP BY link").fetchall())
+        db.close()
+        return counts
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=["link"])["link"].value_counts().to_dict()
+    counts = load_link_index(path)
+    if counts is None:
+        counts = {link: int(n) for link, n in pd.read_csv(path, usecols=["link"])["link"].value_counts().items()}
+        save_link_index(path, counts)
+    return counts
+
+
+def append_losses(rows: pd.DataFrame, path):
+    """
+    Add rows in CSV layout to the end of a store. A CSV is appended to and an SQLite store
+    inserted into, without touching existing rows; a Parquet store is rewritten.
+    """
+    if path.endswith(".parquet"):
+        write_losses(pd.concat([read_losses(path), rows], ignore_index=True), path)
+        return
+    if path.endswith(".sqlite"):
+        insert_rows(path, rows)
+        return
+
+    counts = link_counts(path)
+    header = list(pd.read_csv(path, nrows=0).columns)
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    rows[header].to_csv(path, mode="a", header=False, index=False, encoding="utf-8")
+    for link, n in rows["link"].value_counts().items():
+        counts[link] = counts.get(link, 0) + int(n)
+    save_link_index(path, counts)
+
+
+def read_losses(path) -> pd.DataFrame:
+    """Read a dataset from a CSV, Parquet or SQLite store, in CSV layout."""
+    if path.endswith(".parquet"):
+        return from_typed(pd.read_parquet(path))
+    if path.endswith(".sqlite"):
+        return read_sqlite(path)
+    return pd.read_csv(path)
+
+
+def read_losses_typed(path) -> pd.DataFrame:
+    """Read a dataset from a CSV, Parquet or SQLite store, in the typed schema."""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return to_typed(read_losses(path))
+
+
+# What the pipeline stages load: the CSV layout with explicit dtypes. The text columns repeat a
+# few hundred values over tens of thousands of rows, so they are categorical.
+LOSSES_DTYPES = {**{column: "category" for column in CATEGORICAL_COLUMNS}, "link": "str", "date": "str"}
+
+# Where each row's date stands, computed once at load time so every stage filters on this
+# small column instead of re-deriving isna / blank / NO_DATE_FOUND masks from the date text.
+# Manually changed rows are "manual" whatever their date: no stage may overwrite them.
+NO_DATE_FOUND = "NO_DATE_FOUND"
+DATE_STATE_COLUMN = "date_state"
+DATE_STATES = pd.CategoricalDtype(["missing", "found", "no_date_found", "manual"])
+
+
+def classify_dates(dates: pd.Series, manually_changed: pd.Series) -> pd.Series:
+    """date_state of each row from its date text and manually_changed flag."""
+    text = dates.astype("str").str.strip()
+    codes = np.select(
+        [manually_changed.fillna(False).astype(bool).to_numpy(),
+         (dates.isna() | (text == "")).to_numpy(),
+         (text.str.upper() == NO_DATE_FOUND).to_numpy()],
+        [3, 0, 2],
+        default=1
+    )
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=DATE_STATES), index=dates.index)
+
+
+def date_states(df: pd.DataFrame) -> pd.Series:
+    """The date_state column of a dataset from load_losses, or computed for any other frame."""
+    if DATE_STATE_COLUMN in df.columns:
+        return df[DATE_STATE_COLUMN]
+    manually_changed = df["manually_changed"] if "manually_changed" in df.columns else pd.Series(False, index=df.index)
+    return classify_dates(df["date"], manually_changed)
+
+
+def set_dates(df: pd.DataFrame, rows, dates):
+    """Assign dates to rows (a mask or index labels), keeping their date_state current."""
+    df.loc[rows, "date"] = dates
+    if DATE_STATE_COLUMN in df.columns:
+        df.loc[rows, DATE_STATE_COLUMN] = classify_dates(df.loc[rows, "date"], df.loc[rows, "manually_changed"])
+
+
+def load_losses(path) -> pd.DataFrame:
+    """
+    Read a dataset from any store for the pipeline stages: CSV layout with categorical text
+    columns, a bool manually_changed and the date_state column. save_dates and write_losses
+    take the frame back as is.
+    """
+    if path.endswith(".parquet"):
+        df = from_typed(pd.read_parquet(path), keep_categories=True)
+    elif path.endswith(".sqlite"):
+        df = read_sqlite(path).astype({column: LOSSES_DTYPES[column] for column in CATEGORICAL_COLUMNS})
+    else:
+        df = pd.read_csv(path, dtype=LOSSES_DTYPES)
+    if "manually_changed" not in df.columns:
+        df["manually_changed"] = False
+    df["manually_changed"] = df["manually_changed"].fillna(False).astype(bool)
+    df[DATE_STATE_COLUMN] = classify_dates(df["date"], df["manually_changed"])
+    return df
+
+
+def write_losses(df: pd.DataFrame, path):
+    """Write a dataset in CSV layout to a CSV, Parquet or SQLite store."""
+    if path.endswith(".parquet"):
+        # Write to a temporary file first so an interrupted write never leaves a broken store
+        tmp_path = f"{path}.tmp"
+        to_typed(df).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return
+    if path.endswith(".sqlite"):
+        write_sqlite(df, path)
+        return
+    df.drop(columns=DATE_STATE_COLUMN, errors="ignore").to_csv(path, index=False, encoding="utf-8")
+
+
+def save_dates(df: pd.DataFrame, path, before: pd.Series):
+    """
+    Persist the date changes in `df` since the `before` snapshot of its date column.
+    An SQLite store only updates the changed rows; CSV and Parquet are rewritten, and
+    nothing is written when no date changed.
+    """
+    after = df["date"]
+    previous = before.reindex(after.index)
+    changed = ((after != previous) & ~(after.isna() & previous.isna())).fillna(True)
+    if not changed.any():
+        return
+    if not path.endswith(".sqlite"):
+        # Only dates change, so a link index that was current stays valid for the new file
+        counts = load_link_index(path) if path.endswith(".csv") else None
+        write_losses(df, path)
+        if counts is not None:
+            save_link_index(path, counts)
+        return
+    update_dates(path, after[changed])
+
+
+def export_csv(store_path, csv_path):
+    """Publish a dataset store as CSV."""
+    write_losses(read_losses(store_path), csv_path)
+    # Same mtime as the store, so import_csv_if_newer does not take the export for an edit
+    mtime = os.path.getmtime(store_path)
+    os.utime(csv_path, (mtime, mtime))
+
+
+def import_csv_if_newer(csv_path, store_path):
+    """
+    Copy the published CSV into the store if the store does not exist yet or the CSV was
+    edited after it (e.g. by the manual_changes scripts). Returns True if it imported.
+    """
+    if store_path == csv_path or not os.path.exists(csv_path):
+        return False
+    if os.path.exists(store_path) and os.path.getmtime(store_path) >= os.path.getmtime(csv_path):
+        return False
+    write_losses(pd.read_csv(csv_path), store_path)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dataset store tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write a Parquet or SQLite store to CSV for publishing")
+    export.add_argument("store")
+    export.add_argument("csv")
+    load = commands.add_parser("import", help="load a CSV into a Parquet or SQLite store")
+    load.add_argument("csv")
+    load.add_argument("store")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_csv(args.store, args.csv)
+        print(f"Exported {args.store} to {args.csv}")
+    else:
+        write_losses(pd.read_csv(args.csv), args.store)
+        print(f"Imported {args.csv} into {args.store}")
@@ -1,16 +1,69 @@
 import os
+import threading
 import warnings
 from typing import Optional
 from PIL import Image
-import cv2
-import numpy as np
-import easyocr
-from datetime import datetime
+from date_normalization import (
+    DATE_SEPARATOR_REGEX,
+    NON_DIGIT_OR_SLASH_REGEX,
+    NON_DIGIT_REGEX,
+    SLASH_READ_AS_ONE_REGEX,
+    SLASHES_LOST_REGEX,
+    TEXT_DATE_REGEX,
+    TEXT_YEAR_REGEX,
+    normalize_date,
+)
 
+# torch, cv2 and easyocr are heavy to import and the Reader loads a model, so all of
+# them are deferred until the first image actually needs OCR (see get_reader).
 warnings.filterwarnings("ignore", category=UserWarning, module="torch.utils.data")
 
-# Initialize EasyOCR once
-reader = easyocr.Reader(["en"], gpu=False)
+# Initialize EasyOCR once, on first use
+reader = None
+reader_lock = threading.Lock()
+
+# Version of the OCR settings + date heuristics below. Bump it whenever they change so
+# cached OCR results (see ocr_cache.py) produced by the old version are discarded.
+OCR_CONFIG_VERSION = "7"
+
+# Optional first tier: a digits-and-separators-only recognizer at reduced resolution, returning
+# confidences. An allowlisted reader can turn other digits into a plausible date, so its date
+# is only accepted when one confident fragment is a date as a whole (not part of a longer
+# digit run) and no other fragment reads a different date; anything else goes on to the next
+# tier. Off by default: an image without a date costs one more readtext call with it, and it
+# has not been benchmarked on a real batch yet. Turn it on only after benchmark_ocr.py shows
+# it pays off.
+DIGITS_TIER = False
+DIGITS_ALLOWLIST = "0123456789/.-"
+DIGITS_MAX_SIDE = 1024
+DIGITS_MIN_CONFIDENCE = 0.6
+TIER_DIGITS = "digits"
+
+# Optional second tier: Oryx screenshots usually carry the date in a caption or corner overlay,
+# so OCR can first read only the top and bottom strips (which include the corners) of a copy
+# capped at ROI_MAX_SIDE pixels, stacked into one image so it costs one readtext call. Its date
+# is only accepted on a plain TEXT_DATE_REGEX match; the looser heuristics (year reconstruction,
+# slash fix) only run on the full image. Off by default: an image without a date pays for the
+# strip pass on top of the full pass, and the tier has not been benchmarked on a real batch yet
+# (benchmark_ocr.py). With both tiers off every image gets exactly one full resolution pass.
+ROI_TIER = False
+ROI_STRIP_FRACTION = 0.3
+ROI_MAX_SIDE = 1600
+TIER_ROI = "roi"
+TIER_FULL = "full"
+TIER_NONE = "none"
+
+
+def get_reader():
+    """Return the shared EasyOCR Reader, importing easyocr and loading the model on first call."""
+    global reader
+    if reader is None:
+        with reader_lock:
+            if reader is None:
+                import easyocr
+                reader = easyocr.Reader(["en"], gpu=False)
+    return reader
+
 
 def try_fix_with_slash_heuristic(text: str) -> Optional[str]:
     """
@@ -18,21 +71,19 @@ def try_fix_with_slash_heuristic(text: str) -> Optional[str]:
     Example:
         '11/0912022' -> '11/09/2022'
         '19/0512022' -> '19/05/2022'
-    Only returns a date if it is valid (dd-mm-yyyy) and year >= 2022.
+    Only returns a date if it is valid (see date_normalization).
     """
-    import re
-
     # Keep only digits and slashes
-    cleaned = re.sub(r"[^0-9/]", "", text)
+    cleaned = NON_DIGIT_OR_SLASH_REGEX.sub("", text)
 
     # Match pattern: dd/mm1yyyy (the extra 1 before the year)
-    m = re.match(r"^(\d{1,2})/(\d{2})1(20\d{2})$", cleaned)
+    m = SLASH_READ_AS_ONE_REGEX.match(cleaned)
     if m:
         day, month, year = map(int, m.groups())
         return normalize_date(day, month, year)
 
     # Match pure digits: ddmm1yyyy
-    m = re.match(r"^(\d{2})(\d{2})1(20\d{2})$", cleaned)
+    m = SLASHES_LOST_REGEX.match(cleaned)
     if m:
         day, month, year = map(int, m.groups())
         return normalize_date(day, month, year)
@@ -41,59 +92,74 @@ def try_fix_with_slash_heuristic(text: str) -> Optional[str]:
 
 
 
+def image_to_bgr(img):
+    """
+    Return the numpy array EasyOCR reads for an image.
 
-def normalize_date(day: int, month: int, year: int) -> Optional[str]:
-    """Validate date and return in dd-mm-yyyy format with 4-digit year."""
-    try:
-        # If year is 2 digits and >= 22, prepend 20
-        if year < 100:
-            year += 2000
-        return datetime(year, month, day).strftime("%d-%m-%Y")
-    except ValueError:
-        return None
-
-
-
-def extract_date_from_image(img: Image.Image) -> Optional[str]:
-    """Extract date from a single PIL image with debug output."""
-
-    import re  # move regex inside function for portability
-
-    DATE_REGEX = re.compile(
-        r'(\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b|\b\d{4}[./-]\d{1,2}[./-]\d{1,2}\b)'
-    )
-    YEAR_REGEX = re.compile(r"(20\d{2})")
+    Arrays decoded with cv2 (BGR or 2D grayscale, see extract_images_from_postimg.decode_image)
+    are used as they are. PIL images in any mode (palette, grayscale, RGBA, ...) are converted to RGB first.
+    """
+    import cv2
+    import numpy as np
 
-    img_cv = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-    results = reader.readtext(img_cv, detail=0, paragraph=False)
+    if isinstance(img, np.ndarray):
+        return img
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
 
-    #print("DEBUG: OCR results:", results)  # Show what text was detected
 
-    # 1. Try normal regex first
+def regex_date_from_ocr_texts(results: list[str]) -> Optional[str]:
+    """The first TEXT_DATE_REGEX match in the fragments that is a valid date (heuristic 1 only)."""
     for text in results:
-        match = DATE_REGEX.search(text)
+        match = TEXT_DATE_REGEX.search(text)
         if match:
             raw = match.group(0).replace("-", "/").replace(".", "/")
             parts = raw.split("/")
             #print(f"DEBUG: Regex match found: {raw} -> parts: {parts}")
+            if len(parts[0]) == 4:  # yyyy/mm/dd
+                parts.reverse()
             try:
                 if len(parts) == 3:
                     day, month, year = map(int, parts)
                     norm = normalize_date(day, month, year)
                     #print(f"DEBUG: Normalized date: {norm}")
-                    return norm
+                    if norm:
+                        return norm
             except ValueError:
                 #print(f"DEBUG: ValueError for parts: {parts}")
                 continue
+    return None
+
+
+def digits_date_from_ocr_texts(results: list[str]) -> Optional[str]:
+    """
+    The date of the digits tier: a fragment that fully matches TEXT_DATE_REGEX and is a valid
+    date. None when no fragment does, or when fragments read different dates.
+    """
+    dates = {regex_date_from_ocr_texts([text]) for text in results if TEXT_DATE_REGEX.fullmatch(text.strip())}
+    dates.discard(None)
+    return dates.pop() if len(dates) == 1 else None
+
+
+def date_from_ocr_texts(results: list[str]) -> Optional[str]:
+    """Apply the three date heuristics to the text fragments OCR found in one image."""
+
+    #print("DEBUG: OCR results:", results)  # Show what text was detected
+
+    # 1. Try normal regex first
+    norm = regex_date_from_ocr_texts(results)
+    if norm:
+        return norm
 
     # 2. Fallback: detect year and reconstruct
     for text in results:
-        year_match = YEAR_REGEX.search(text)
+        year_match = TEXT_YEAR_REGEX.search(text)
         if year_match:
             year = int(year_match.group(1))
             idx = text.find(str(year))
             prefix = text[max(0, idx - 10):idx]
-            cleaned = re.sub(r"[^0-9]", "", prefix)
+            cleaned = NON_DIGIT_REGEX.sub("", prefix)
 
             candidates = []
             if len(cleaned) >= 4:
@@ -101,7 +167,7 @@ def extract_date_from_image(img: Image.Image) -> Optional[str]:
             if len(cleaned) >= 3:
                 candidates.append((cleaned[0], cleaned[1:], year))
 
-            sep_digits = [d for d in re.split(r"[./-]", prefix.strip()) if d.isdigit()]
+            sep_digits = [d for d in DATE_SEPARATOR_REGEX.split(prefix.strip()) if d.isdigit()]
             if len(sep_digits) >= 2:
                 candidates.append((sep_digits[-2], sep_digits[-1], year))
 
@@ -130,6 +196,112 @@ def extract_date_from_image(img: Image.Image) -> Optional[str]:
     return None
 
 
+def downscale(array, max_side=ROI_MAX_SIDE):
+    """Shrink an image array so its longest side is at most max_side pixels."""
+    import cv2
+
+    height, width = array.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return array
+    return cv2.resize(array, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+
+
+def roi_strips(array):
+    """
+    Top and bottom strips of an image, where date captions and corner overlays sit, stacked
+    into one array so both are read in one pass.
+    """
+    import numpy as np
+
+    height = array.shape[0]
+    strip = max(1, int(height * ROI_STRIP_FRACTION))
+    return np.ascontiguousarray(np.concatenate([array[:strip], array[height - strip:]]))
+
+
+def read_texts_batched(arrays, allowlist=None, min_confidence=None) -> list[list[str]]:
+    """
+    OCR several image arrays, returning the detected text fragments per array.
+
+    EasyOCR can only stack images of the same size into one detection batch, so arrays
+    are grouped by shape; a group of one falls back to the single image path.
+    With min_confidence set, fragments recognized with a lower confidence are dropped.
+    """
+    detail = 0 if min_confidence is None else 1
+    options = {"detail": detail, "paragraph": False}
+    if allowlist:
+        options["allowlist"] = allowlist
+
+    positions_by_shape = {}
+    for pos, array in enumerate(arrays):
+        positions_by_shape.setdefault(array.shape, []).append(pos)
+
+    texts = [None] * len(arrays)
+    for positions in positions_by_shape.values():
+        if len(positions) == 1:
+            batch_results = [get_reader().readtext(arrays[positions[0]], **options)]
+        else:
+            batch_results = get_reader().readtext_batched([arrays[pos] for pos in positions], **options)
+        for pos, results in zip(positions, batch_results):
+            if detail:
+                # (bbox, text, confidence) -> text, keeping only confident fragments
+                results = [text for _, text, confidence in results if confidence >= min_confidence]
+            texts[pos] = results
+    return texts
+
+
+def extract_dates_and_tiers_from_image_batch(images: list) -> list[tuple[Optional[str], str]]:
+    """
+    Extract dates from several images (PIL images or decoded cv2 arrays). Returns one (date or None, tier) per image.
+
+    Each tier only runs on the images the previous tiers found no date in:
+    Tier TIER_DIGITS (only if DIGITS_TIER): digits-only recognizer on the strips at reduced resolution,
+    a single confident fragment that is a date as a whole only.
+    Tier TIER_ROI (only if ROI_TIER): full recognizer on the downscaled top/bottom strips,
+    plain regex matches only.
+    Tier TIER_FULL: full recognizer on the whole image at full resolution, all three date heuristics.
+    Tier TIER_NONE: no tier found a date.
+    A strip tier that finds no date it accepts leaves the image to the next tier.
+    """
+    arrays = [image_to_bgr(img) for img in images]
+    results = [None] * len(arrays)
+
+    def run_strip_tier(tier, max_side, date_from_texts, **read_options):
+        pending = [i for i, result in enumerate(results) if result is None]
+        strips = [roi_strips(downscale(arrays[i], max_side)) for i in pending]
+        for i, texts in zip(pending, read_texts_batched(strips, **read_options)):
+            date = date_from_texts(texts)
+            if date:
+                results[i] = (date, tier)
+
+    # 1. Digits only, reduced resolution, confidence gated
+    if DIGITS_TIER:
+        run_strip_tier(TIER_DIGITS, DIGITS_MAX_SIDE, digits_date_from_ocr_texts,
+                       allowlist=DIGITS_ALLOWLIST, min_confidence=DIGITS_MIN_CONFIDENCE)
+
+    # 2. Likely date regions at capped resolution
+    if ROI_TIER:
+        run_strip_tier(TIER_ROI, ROI_MAX_SIDE, regex_date_from_ocr_texts)
+
+    # 3. Fallback: full image at full resolution
+    pending = [i for i, result in enumerate(results) if result is None]
+    for i, texts in zip(pending, read_texts_batched([arrays[i] for i in pending])):
+        date = date_from_ocr_texts(texts)
+        results[i] = (date, TIER_FULL if date else TIER_NONE)
+
+    return results
+
+
+def extract_dates_from_image_batch(images: list[Image.Image]) -> list[Optional[str]]:
+    """Extract dates from several PIL images; one date (or None) per image."""
+    return [date for date, _ in extract_dates_and_tiers_from_image_batch(images)]
+
+
+def extract_date_from_image(img: Image.Image) -> Optional[str]:
+    """Extract date from a single PIL image."""
+    return extract_dates_from_image_batch([img])[0]
+
+
 
 if __name__ == "__main__":
     base = "tests/test_samples_OCR/slashes"
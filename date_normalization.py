@@ -0,0 +1,127 @@
+import re
+from datetime import date
+from typing import Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# One place that decides what a valid loss date is, used by OCR, the link string parser and
+# csv_check alike. Dates are dd-mm-yyyy strings; two-digit years are read as 20yy. A date
+# must exist in the calendar and fall inside the date window, so OCR misreads and typos
+# like 31-11-2022 or 18-13-2023 are rejected everywhere in the same way. The window runs from
+# the start of 2022 to the end of the current year, so it moves along with new losses.
+# normalize_date is the scalar entry point (one date, e.g. per OCR text), normalize_dates the
+# vectorized one (NumPy arrays, e.g. a whole link column); parse_dates and invalid_date_reasons
+# read and check stored dd-mm-yyyy columns.
+DATE_FORMAT = "%d-%m-%Y"
+DEFAULT_DATE_WINDOW = (date(2022, 1, 1), date(date.today().year, 12, 31))
+date_window = {"start": DEFAULT_DATE_WINDOW[0], "end": DEFAULT_DATE_WINDOW[1]}
+
+# Patterns, compiled once
+# A date in free text (OCR): d/m/y or y/m/d with '/', '.' or '-' between the parts
+TEXT_DATE_REGEX = re.compile(r"(\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b|\b\d{4}[./-]\d{1,2}[./-]\d{1,2}\b)")
+TEXT_YEAR_REGEX = re.compile(r"(20\d{2})")
+DATE_SEPARATOR_REGEX = re.compile(r"[./-]")
+NON_DIGIT_REGEX = re.compile(r"[^0-9]")
+NON_DIGIT_OR_SLASH_REGEX = re.compile(r"[^0-9/]")
+# OCR reading the '/' before the year as a '1': dd/mm1yyyy, or ddmm1yyyy when all slashes are lost
+SLASH_READ_AS_ONE_REGEX = re.compile(r"^(\d{1,2})/(\d{2})1(20\d{2})$")
+SLASHES_LOST_REGEX = re.compile(r"^(\d{2})(\d{2})1(20\d{2})$")
+# A stored date (dd-mm-yyyy), for validation; a plain string so pandas can run it vectorized
+STORED_DATE_REGEX = r"^(?P<day>\d{2})-(?P<month>\d{2})-(?P<year>\d{4})$"
+
+
+def configure_date_window(start=DEFAULT_DATE_WINDOW[0], end=DEFAULT_DATE_WINDOW[1]):
+    """Change the first and last date (datetime.date, inclusive) accepted anywhere."""
+    date_window.update(start=start, end=end)
+
+
+def date_window_label() -> str:
+    """The date window as text, e.g. '20220101-20261231', for logs."""
+    return f"{date_window['start']:%Y%m%d}-{date_window['end']:%Y%m%d}"
+
+
+def window_key(day: date) -> int:
+    return (day.year * 100 + day.month) * 100 + day.day
+
+
+def expand_year(year):
+    """Two-digit years are 20yy; works on ints and NumPy arrays."""
+    if isinstance(year, np.ndarray):
+        return np.where((year >= 0) & (year < 100), year + 2000, year)
+    return year + 2000 if 0 <= year < 100 else year
+
+
+def normalize_date(day: int, month: int, year: int) -> Optional[str]:
+    """dd-mm-yyyy for a real date inside the date window, else None."""
+    try:
+        parsed = date(expand_year(year), month, day)
+    except ValueError:
+        return None
+    if not date_window["start"] <= parsed <= date_window["end"]:
+        return None
+    return parsed.strftime(DATE_FORMAT)
+
+
+def days_in_month(year: np.ndarray, month: np.ndarray) -> np.ndarray:
+    """Number of days in each (year, month) pair; month must be 1..12."""
+    first = ((year - 1970) * 12 + (month - 1)).astype("datetime64[M]")
+    return ((first + 1).astype("datetime64[D]") - first.astype("datetime64[D]")).astype(int)
+
+
+def valid_dates(day: np.ndarray, month: np.ndarray, year: np.ndarray) -> np.ndarray:
+    """Vectorized check: real calendar dates inside the date window (years already four digits)."""
+    valid = (month >= 1) & (month <= 12) & (day >= 1)
+    valid &= day <= days_in_month(year, np.where(valid, month, 1))
+    key = (year * 100 + month) * 100 + day
+    return valid & (key >= window_key(date_window["start"])) & (key <= window_key(date_window["end"]))
+
+
+def normalize_dates(day, month, year, index=None) -> pd.Series:
+    """
+    Vectorized normalize_date over int arrays (use -1 for no value): dd-mm-yyyy strings,
+    None where the parts are not a valid date. Each distinct date is formatted once.
+    """
+    day, month, year = (np.asarray(values, dtype=np.int64) for values in (day, month, year))
+    year = expand_year(year)
+    valid = valid_dates(day, month, year)
+    keys, inverse = np.unique((year * 100 + month) * 100 + day, return_inverse=True)
+    labels = np.array([f"{key % 100:02d}-{key // 100 % 100:02d}-{key // 10000}" for key in keys], dtype=object)
+    return pd.Series(np.where(valid, labels[inverse], None), index=index, dtype=object)
+
+
+def date_parts(dates: pd.Series) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(day, month, year) int arrays of dd-mm-yyyy strings; -1 where a string is not in that format."""
+    # pyarrow strings, so str.extract runs in RE2 instead of a Python loop
+    text = dates.fillna("").astype("str").astype(pd.ArrowDtype(pa.string())).str.strip()
+    parts = text.str.extract(STORED_DATE_REGEX)
+    return tuple(parts[name].fillna("-1").astype(np.int64).to_numpy() for name in ("day", "month", "year"))
+
+
+def parse_dates(dates: pd.Series) -> pd.Series:
+    """Vectorized: datetimes for the valid dd-mm-yyyy strings inside the window, NaT for the rest."""
+    day, month, year = date_parts(dates)
+    valid = valid_dates(day, month, year)
+    parsed = pd.to_datetime(pd.DataFrame({"year": year, "month": month, "day": day})[valid])
+    return parsed.reindex(range(len(dates))).set_axis(dates.index)
+
+
+def invalid_date_reasons(dates: pd.Series) -> pd.Series:
+    """Vectorized validation of dd-mm-yyyy strings: why each date is invalid, None for valid ones."""
+    day, month, year = date_parts(dates)
+    start, end = date_window["start"], date_window["end"]
+    key = (year * 100 + month) * 100 + day
+    checks = [
+        (year < 0, "Invalid format"),
+        ((day < 1) | (day > 31), "Invalid day: {day}"),
+        ((month < 1) | (month > 12), "Invalid month: {month}"),
+        (day > days_in_month(year, np.clip(month, 1, 12)), "Invalid day: {day}"),
+        ((year < start.year) | (year > end.year), "Invalid year: {year}"),
+        ((key < window_key(start)) | (key > window_key(end)),
+         f"Outside date window {start.strftime(DATE_FORMAT)} to {end.strftime(DATE_FORMAT)}"),
+    ]
+    failed = np.select([failed for failed, _ in checks], range(len(checks)), default=-1)  # first failing check
+    reasons = np.full(len(dates), None, dtype=object)
+    for i in np.flatnonzero(failed >= 0):
+        reasons[i] = checks[failed[i]][1].format(day=day[i], month=month[i], year=year[i])
+    return pd.Series(reasons, index=dates.index, dtype=object)
@@ -1,8 +1,95 @@
+import hashlib
+import json
+import os
 import requests
+from worker_limits import http_slot
 
-def download_html(url, filename):
-    """Download HTML from a URL and save locally."""
-    response = requests.get(url)
+# Ask for a compressed transfer. requests/urllib3 decode gzip out of the box,
+# brotli only when the brotli (or brotlicffi) package is installed.
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "br, gzip"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip"
+
+
+def meta_path_for(filename):
+    """
+    Sidecar file holding ETag, Last-Modified and content hash of a downloaded snapshot.
+    It is committed next to the snapshot, so a fresh CI checkout still skips an unchanged page.
+    """
+    return f"{filename}.meta.json"
+
+
+def load_download_meta(meta_file):
+    if not os.path.exists(meta_file):
+        return {}
+    with open(meta_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_download_meta(meta_file, meta):
+    with open(meta_file, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def snapshot_processed(filename, meta_file=None):
+    """True if the pipeline completed on the snapshot on disk (see mark_snapshot_processed)."""
+    meta = load_download_meta(meta_file or meta_path_for(filename)) if os.path.exists(filename) else {}
+    return meta.get("sha256") is not None and meta.get("processed_sha256") == meta["sha256"]
+
+
+def mark_snapshot_processed(filename, meta_file=None):
+    """Record that the pipeline completed on the current snapshot, so unchanged pages can be skipped."""
+    meta_file = meta_file or meta_path_for(filename)
+    meta = load_download_meta(meta_file)
+    meta["processed_sha256"] = meta.get("sha256")
+    save_download_meta(meta_file, meta)
+
+
+def download_html(url, filename, meta_file=None, timeout=(10, 60)):
+    """Download HTML from a URL and save locally, only if it changed.
+
+    Sends If-None-Match / If-Modified-Since from the previous download and asks for a
+    gzip (or brotli) encoded response. The file is only rewritten when the server
+    returns new content whose sha256 differs from the last snapshot.
+
+    Returns True if the snapshot changed, False if it is identical to the one on disk.
+    An unchanged snapshot may still need processing when an earlier run did not complete,
+    see snapshot_processed.
+    """
+    meta_file = meta_file or meta_path_for(filename)
+    meta = load_download_meta(meta_file) if os.path.exists(filename) else {}
+
+    headers = {"Accept-Encoding": ACCEPT_ENCODING}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    with http_slot():
+        response = requests.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return False
     response.raise_for_status()  # Raise error if request fails
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(response.text)
+
+    content = response.text.encode("utf-8")
+    content_hash = hashlib.sha256(content).hexdigest()
+    changed = content_hash != meta.get("sha256")
+
+    if changed:
+        with open(filename, "wb") as f:
+            f.write(content)
+
+    save_download_meta(meta_file, {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": content_hash,
+        "processed_sha256": meta.get("processed_sha256"),
+    })
+    return changed
@@ -1,20 +1,20 @@
-import pandas as pd
-from extract_from_links_with_dates import extract_date_from_postimg_with_date_in_link_string
+from dataset_store import DATE_STATE_COLUMN, load_losses, save_dates, set_dates
+from extract_from_links_with_dates import extract_dates_from_postimg_link_strings
 from extract_dates_from_twitter import extract_dates_from_twitter
 from extract_dates_from_images import extract_dates_from_images
 
 
-def extract_dates(csv_path, logger=None):
-    df = pd.read_csv(csv_path)
-
-    # Ensure columns
-    if "manually_changed" not in df.columns:
-        df["manually_changed"] = False
+def extract_dates(csv_path, logger=None, ocr_workers=1, ocr_batch_size=1):
+    df = load_losses(csv_path)
     df["date"] = df["date"].astype(object)
+    saved_dates = df["date"].copy()  # only changed rows are written back to an SQLite store
+
+    # Link kinds are classified once; date_state (see dataset_store) says which rows are still open
+    postimg_link = df["link"].str.contains("postimg|i.postimg|postlmg", regex=True, na=False)
+    twitter_link = df["link"].str.contains("twitter.com|x.com", regex=True, na=False)
 
     total_rows = len(df)
-    missing_date = df["date"].isna() | (df["date"].astype(str).str.strip() == "")
-    total_missing_initial = missing_date.sum()
+    total_missing_initial = (df[DATE_STATE_COLUMN] == "missing").sum()
 
     log = lambda msg: logger.info(msg) if logger else print(msg)
 
@@ -22,50 +22,37 @@ def extract_dates(csv_path, logger=None):
     log(f"❌ New rows missing date: {total_missing_initial}")
 
     # --- Postimg links (from link string) ---
-    mask_postimg = (
-        df["link"].str.contains("postimg|i.postimg|postlmg", regex=True, na=False)
-        & missing_date
-        & ~df["manually_changed"]
-    )
+    mask_postimg = postimg_link & (df[DATE_STATE_COLUMN] == "missing")
     count_postimg = mask_postimg.sum()
     log(f"🔍 Processing Postimg links with missing date: {count_postimg}")
 
     if count_postimg > 0:
         before_count = df["date"].notna().sum()
-        df.loc[mask_postimg, "date"] = df.loc[mask_postimg, "link"].apply(
-            extract_date_from_postimg_with_date_in_link_string
-        )
+        set_dates(df, mask_postimg, extract_dates_from_postimg_link_strings(df.loc[mask_postimg, "link"]))
         after_count = df["date"].notna().sum()
         log(f"✅ Dates found from Postimg link strings: {after_count - before_count}")
 
     # --- Twitter/X links ---
-    mask_twitter = (
-        df["link"].str.contains("twitter.com|x.com", regex=True, na=False)
-        & ((df["date"].isna()) | (df["date"].astype(str).str.strip() == ""))
-        & ~df["manually_changed"]
-    )
+    mask_twitter = twitter_link & (df[DATE_STATE_COLUMN] == "missing")
     count_twitter = mask_twitter.sum()
     log(f"🐦 Processing Twitter/X links with missing date: {count_twitter}")
 
     if count_twitter > 0:
         before_count = df["date"].notna().sum()
         df_twitter = df[mask_twitter].copy()
-        df_twitter = extract_dates_from_twitter(df_twitter)
-        df.loc[mask_twitter, "date"] = df_twitter["date"]
+        df_twitter = extract_dates_from_twitter(df_twitter, logger=logger)
+        set_dates(df, mask_twitter, df_twitter["date"])
         after_count = df["date"].notna().sum()
         log(f"✅ Dates found from Twitter extraction: {after_count - before_count}")
 
     # --- SAVE RESULTS BEFORE OCR ---
-    df.to_csv(csv_path, index=False, encoding="utf-8")
+    save_dates(df, csv_path, before=saved_dates)
+    saved_dates = df["date"].copy()
     saved_count = df["date"].notna().sum() - (total_rows - total_missing_initial)
     log(f"💾 CSV saved with Postimg + Twitter dates before starting OCR | New rows saved: {saved_count}")
 
     # --- Postimg images (OCR fallback) ---
-    mask_postimg_missing = (
-        df["link"].str.contains("postimg|i.postimg|postlmg", regex=True, na=False)
-        & ((df["date"].isna()) | (df["date"].astype(str).str.strip() == ""))
-        & ~df["manually_changed"]
-    )
+    mask_postimg_missing = postimg_link & (df[DATE_STATE_COLUMN] == "missing")
     count_postimg_missing = mask_postimg_missing.sum()
     log(f"🖼️ Processing Postimg images with missing date (OCR): {count_postimg_missing}")
 
@@ -75,21 +62,23 @@ def extract_dates(csv_path, logger=None):
         df = extract_dates_from_images(
             df,
             csv_path=csv_path,
-            logger=logger
+            logger=logger,
+            ocr_workers=ocr_workers,
+            ocr_batch_size=ocr_batch_size
         )
         after_count = df["date"].notna().sum()
         found_ocr = after_count - before_count
         log(f"✅ Dates found via image OCR: {found_ocr}")
 
     # --- Final summary ---
-    total_missing_final = df["date"].isna().sum() + (df["date"].astype(str).str.strip() == "").sum()
-    log(f"🏁 Extraction complete.")
+    total_missing_final = (df[DATE_STATE_COLUMN] == "missing").sum()
+    log("🏁 Extraction complete.")
     log(f"🧮 Total rows processed: {total_rows}")
     log(f"🕵️ Found dates - Postimg link: {count_postimg}, Twitter: {count_twitter}, OCR: {count_postimg_missing}")
     log(f"📊 Remaining new rows missing dates: {total_missing_final}")
 
     # Save back
-    df.to_csv(csv_path, index=False, encoding="utf-8")
+    save_dates(df, csv_path, before=saved_dates)
     log("💾 CSV file saved with updated dates.")
 
 
@@ -1,31 +1,105 @@
 import os
+import time
+from collections import Counter
 import pandas as pd
 import logging
-from extract_images_from_postimg import load_postimg_image
-from date_extracting_from_image_using_OCR import extract_date_from_image
+from collections import deque
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+import date_extracting_from_image_using_OCR
+import extract_images_from_postimg
+from extract_images_from_postimg import load_postimg_array_with_hash
+from http_session import LATENCY
+from date_normalization import date_window_label
+from dataset_store import NO_DATE_FOUND, date_states, load_losses, save_dates, set_dates
+from ocr_cache import DEFAULT_OCR_CACHE_PATH, OcrResultCache
+from ocr_journal import OcrJournal, journal_path_for, load_ocr_journal
+from ocr_pool import make_ocr_pool, ocr_image_batch
+from date_extracting_from_image_using_OCR import (
+    OCR_CONFIG_VERSION,
+    TIER_DIGITS,
+    TIER_FULL,
+    TIER_NONE,
+    TIER_ROI,
+    extract_dates_and_tiers_from_image_batch,
+)
 import warnings
 
 warnings.filterwarnings("ignore", category=UserWarning, module="torch.utils.data")
 
 
-def load_images_from_csv(df: pd.DataFrame, retry_only_no_date=False):
+def rows_needing_ocr(df: pd.DataFrame, retry_only_no_date=False, skip_links=()) -> pd.DataFrame:
     """
-    Generator yielding (index, url, image) for rows needing OCR.
+    Rows with a postimg link that still need OCR (date_state 'missing').
+    If retry_only_no_date=True, only rows where date == 'NO_DATE_FOUND'.
+    Rows whose link is in `skip_links` (already in the OCR journal) are left out.
+    """
+    date_mask = date_states(df) == ("no_date_found" if retry_only_no_date else "missing")
+    mask = df["link_type"].isin(["i.postimg", "postimg", "postlmg"]) & date_mask
+    if len(skip_links):
+        mask &= ~df["link"].isin(skip_links)
+    return df[mask]
+
+
+def replay_ocr_journal(df: pd.DataFrame, entries: dict) -> int:
+    """
+    Apply journaled OCR results ({link: date}) of an interrupted run to the rows still
+    missing a date or marked NO_DATE_FOUND. Returns the number of rows filled in.
+    """
+    if not entries:
+        return 0
+    postimg = df["link_type"].isin(["i.postimg", "postimg", "postlmg"])
+    open_rows = date_states(df).isin(["missing", "no_date_found"])
+    mask = postimg & open_rows & df["link"].isin(entries.keys())
+    set_dates(df, mask, df.loc[mask, "link"].map(entries).fillna(NO_DATE_FOUND))
+    return int(mask.sum())
+
+
+def group_rows_by_link(rows_to_process: pd.DataFrame) -> dict:
+    """Map each unique link to the row indices that share it, in first-seen order.
+
+    One postimg image with several hulls produces several rows; it only needs one
+    download and one OCR pass.
+    """
+    groups = {}
+    for idx, link in zip(rows_to_process.index, rows_to_process["link"]):
+        groups.setdefault(link, []).append(idx)
+    return groups
+
+
+def load_images_from_csv(df: pd.DataFrame, retry_only_no_date=False, download_threads=4, prefetch_depth=8, skip_links=()):
+    """
+    Generator yielding (indices, url, sha256, image) for each unique link among rows needing OCR.
+    `indices` lists every row sharing that link, so each image is fetched only once.
     If retry_only_no_date=True, only processes rows where date == 'NO_DATE_FOUND'.
+    Links in `skip_links` are not loaded.
+
+    Images are downloaded by `download_threads` threads while the caller runs OCR.
+    At most `prefetch_depth` images are downloaded or in flight ahead of the caller,
+    so memory stays bounded. Links are yielded in their original row order.
     """
-    if retry_only_no_date:
-        rows_to_process = df[
-            df["link_type"].isin(["i.postimg", "postimg", "postlmg"]) &
-            (df["date"].astype(str).str.upper() == "NO_DATE_FOUND")
-        ]
-    else:
-        rows_to_process = df[
-            df["link_type"].isin(["i.postimg", "postimg", "postlmg"]) &
-            (df["date"].isna() | (df["date"].astype(str).str.strip() == ""))
-        ]
+    rows_to_process = rows_needing_ocr(df, retry_only_no_date=retry_only_no_date, skip_links=skip_links)
+    links = group_rows_by_link(rows_to_process).items()
+
+    # No prefetching: download right before each OCR call
+    if download_threads < 1 or prefetch_depth < 1:
+        for url, indices in links:
+            yield (indices, url, *load_postimg_array_with_hash(url))
+        return
 
-    for idx, row in rows_to_process.iterrows():
-        yield idx, row["link"], load_postimg_image(row["link"])
+    pool = ThreadPoolExecutor(max_workers=download_threads, thread_name_prefix="postimg-fetch")
+    pending = deque()
+    try:
+        for url, indices in links:
+            pending.append((indices, url, pool.submit(load_postimg_array_with_hash, url)))
+            if len(pending) >= prefetch_depth:
+                indices, url, future = pending.popleft()
+                yield (indices, url, *future.result())
+        while pending:
+            indices, url, future = pending.popleft()
+            yield (indices, url, *future.result())
+    finally:
+        # Stop queued downloads if the consumer stops early
+        pool.shutdown(wait=True, cancel_futures=True)
 
 
 def extract_dates_from_images(
@@ -34,57 +108,163 @@ def extract_dates_from_images(
     batch_size: int = 10,
     logger=None,
     retry_only_no_date=False,
+    download_threads: int = 4,
+    prefetch_depth: int = 8,
+    ocr_cache_path: str | None = DEFAULT_OCR_CACHE_PATH,
+    ocr_workers: int = 1,
+    ocr_batch_size: int = 1,
 ):
     """
     Extract dates from images using OCR. Saves batch progress without removing existing rows.
+    Images are prefetched by `download_threads` threads, at most `prefetch_depth` ahead of OCR.
+    Rows sharing a link are downloaded and OCR'd once; the date is written to all of them.
+    Every result is appended to an OCR journal next to the CSV (see ocr_journal), synced to
+    disk every `batch_size` images. The CSV is written once at the end and the journal removed;
+    a journal left by an interrupted run is replayed first, so the run resumes where it stopped.
+    OCR results are cached by image hash in `ocr_cache_path` (None disables the cache).
+    With `ocr_workers` > 1, OCR runs in a process pool with one EasyOCR Reader per worker.
+    Images are OCR'd `ocr_batch_size` at a time through extract_dates_from_image_batch.
     """
     processed_count = 0
+    images_done = 0
+    tier_counts = Counter()  # which OCR tier found the date (see date_extracting_from_image_using_OCR)
+    start_time = time.perf_counter()
+    LATENCY.reset()
+
+    saved_dates = df["date"].copy()  # only changed rows are written back to an SQLite store
+
+    # Resume an interrupted run: results already in the journal are not OCR'd again
+    journal_path = journal_path_for(csv_path)
+    journaled = load_ocr_journal(journal_path)
+    resumed_rows = replay_ocr_journal(df, journaled)
+    if logger and journaled:
+        logger.info(f"📒 Resuming from OCR journal: {len(journaled)} images, {resumed_rows} rows already done")
+    journal = OcrJournal(journal_path, sync_every=batch_size)
 
     # Compute rows we actually need to process
-    rows_to_process = df[
-        df["link_type"].isin(["i.postimg", "postimg", "postlmg"]) &
-        ((df["date"].astype(str).str.upper() == "NO_DATE_FOUND") if retry_only_no_date
-         else (df["date"].isna() | (df["date"].astype(str).str.strip() == "")))
-    ]
+    rows_to_process = rows_needing_ocr(df, retry_only_no_date=retry_only_no_date, skip_links=list(journaled))
+    # Grayscale decoding feeds OCR different pixels and the optional tiers read them differently,
+    # so their results are cached separately (the date window is checked per row, see ocr_cache)
+    ocr_version = OCR_CONFIG_VERSION + ("-gray" if extract_images_from_postimg.DECODE_GRAYSCALE else "")
+    ocr_version += "-digits" if date_extracting_from_image_using_OCR.DIGITS_TIER else ""
+    ocr_version += "-roi" if date_extracting_from_image_using_OCR.ROI_TIER else ""
+    ocr_cache = OcrResultCache(ocr_cache_path, version=ocr_version) if ocr_cache_path else None
 
     total_to_process = len(rows_to_process)
+    unique_links = rows_to_process["link"].nunique()
     if logger:
         logger.info(f"🖼️ Starting OCR on {total_to_process} rows.")
+        logger.info(
+            f"🔗 {total_to_process} rows share {unique_links} unique images | "
+            f"Deduplication saves {total_to_process - unique_links} downloads and OCR runs"
+        )
 
-    for idx, url, img in load_images_from_csv(df, retry_only_no_date=retry_only_no_date):
-        remaining = total_to_process - processed_count - 1
+    def row_label(indices):
+        return f"[{indices[0]}]" if len(indices) == 1 else f"[{indices[0]} +{len(indices) - 1} rows]"
 
-        if img:
-            if logger:
-                logger.info(f"[{idx}] Loaded image from {url}: size={img.size}, format={img.format}")
-            date_str = extract_date_from_image(img)
-            df.at[idx, "date"] = date_str if date_str else "NO_DATE_FOUND"
-            if logger:
-                logger.info(f"[{idx}] {'✅ Extracted date' if date_str else '❌ No date found'} ({remaining} remaining)")
-        else:
-            df.at[idx, "date"] = "NO_DATE_FOUND"
-            if logger:
-                logger.info(f"[{idx}] ⚠️ Failed to load image from {url} ({remaining} remaining)")
+    def store_result(indices, date_str, message):
+        """Write one image's result to all its rows, journal it and log it."""
+        nonlocal processed_count, images_done
+        processed_count += len(indices)
+        images_done += 1
+        set_dates(df, indices, date_str if date_str else NO_DATE_FOUND)
+        journal.append(df.at[indices[0], "link"], date_str or None)
+        if logger:
+            logger.info(f"{row_label(indices)} {message} ({total_to_process - processed_count} remaining)")
+            if images_done % batch_size == 0:
+                logger.info(f"💾 Progress journaled after {processed_count} OCR rows.")
+
+    def store_ocr_result(indices, content_hash, date_str, tier):
+        tier_counts[tier] += 1
+        if ocr_cache is not None:
+            ocr_cache.put(content_hash, date_str)
+        store_result(indices, date_str, "✅ Extracted date" if date_str else "❌ No date found")
+
+    pool = make_ocr_pool(ocr_workers) if ocr_workers > 1 else None
+    in_flight = {}  # OCR future -> [(indices, content_hash), ...] of its batch
+    batch = []      # (indices, content_hash, img) waiting for OCR
+
+    def collect(return_when):
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            for (indices, content_hash), (date_str, tier) in zip(in_flight.pop(future), future.result()):
+                store_ocr_result(indices, content_hash, date_str, tier)
 
-        processed_count += 1
+    def flush_batch():
+        """OCR the pending batch in-process, or hand it to the worker pool."""
+        items = [(indices, content_hash) for indices, content_hash, _ in batch]
+        images = [img for _, _, img in batch]
+        batch.clear()
+        if pool is None:
+            for (indices, content_hash), (date_str, tier) in zip(items, extract_dates_and_tiers_from_image_batch(images)):
+                store_ocr_result(indices, content_hash, date_str, tier)
+            return
+        in_flight[pool.submit(ocr_image_batch, images)] = items
+        # Keep every worker busy, but hold at most two batches per worker in memory
+        if len(in_flight) >= 2 * ocr_workers:
+            collect(FIRST_COMPLETED)
+
+    images = load_images_from_csv(
+        df,
+        retry_only_no_date=retry_only_no_date,
+        download_threads=download_threads,
+        prefetch_depth=prefetch_depth,
+        skip_links=list(journaled)
+    )
+    try:
+        for indices, url, content_hash, img in images:
+            if img is None:
+                store_result(indices, None, f"⚠️ Failed to load image from {url}")
+                continue
 
-        # Batch save: always save the **full DataFrame**
-        if processed_count % batch_size == 0:
-            df.to_csv(csv_path, index=False)
             if logger:
-                logger.info(f"💾 Saved progress after {processed_count} OCR rows (full DataFrame).")
+                logger.info(f"{row_label(indices)} Loaded image from {url}: shape={img.shape}")
+
+            hit, date_str = ocr_cache.get(content_hash) if ocr_cache is not None else (False, None)
+            if hit:
+                store_result(indices, date_str, "♻️ OCR result reused from cache")
+                continue
+
+            batch.append((indices, content_hash, img))
+            if len(batch) >= max(1, ocr_batch_size):
+                flush_batch()
+
+        if batch:
+            flush_batch()
+        if in_flight:
+            collect(ALL_COMPLETED)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        journal.close()
+
+    # Single save at the end (an SQLite store only gets the changed rows); only then is the journal no longer needed
+    save_dates(df, csv_path, before=saved_dates)
+    journal.remove()
+    if logger and tier_counts:
+        ocr_total = sum(tier_counts.values())
+        logger.info("🎯 OCR tiers (images resolved per tier): " + ", ".join(
+            f"{tier} {tier_counts[tier]} ({tier_counts[tier] / ocr_total:.0%})"
+            for tier in (TIER_DIGITS, TIER_ROI, TIER_FULL, TIER_NONE)
+        ))
+    if ocr_cache is not None:
+        if logger:
+            logger.info(f"♻️ OCR cache: {ocr_cache.hits} hits, {ocr_cache.misses} misses (version {ocr_version}, date window {date_window_label()})")
+        ocr_cache.close()
 
-    # Final save of full DataFrame
-    df.to_csv(csv_path, index=False)
     if logger:
         logger.info("✅ Final CSV save completed (full DataFrame).")
+        logger.info(
+            f"🌐 Postimg fetches: {LATENCY.summary()} | "
+            f"OCR run wall time {time.perf_counter() - start_time:.1f}s"
+        )
 
     return df
 
 
 if __name__ == "__main__":
     # Scan for CSV files in current folder
-    csv_files = [f for f in os.listdir(".") if f.endswith(".csv")]
+    csv_files = [f for f in os.listdir(".") if f.endswith((".csv", ".parquet"))]
     if not csv_files:
         print("No CSV files found in current directory.")
         exit(1)
@@ -101,7 +281,7 @@ if __name__ == "__main__":
         exit(1)
 
     # Logging setup
-    log_file = csv_path.replace(".csv", "_ocr.log")
+    log_file = os.path.splitext(csv_path)[0] + "_ocr.log"
     logging.basicConfig(
         filename=log_file,
         level=logging.INFO,
@@ -113,8 +293,8 @@ if __name__ == "__main__":
     logger = logging.getLogger()
 
     # Load CSV
-    df = pd.read_csv(csv_path)
-    no_date_rows = df[df["date"].astype(str).str.upper() == "NO_DATE_FOUND"]
+    df = load_losses(csv_path)
+    no_date_rows = df[df["date_state"] == "no_date_found"]
     count_no_date = len(no_date_rows)
 
     # Ask user if they want to retry
@@ -1,53 +1,73 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone
+from dataset_store import date_states, set_dates
+
+TWITTER_EPOCH_MS = 1288834974657  # 2010-11-04 01:42:54 UTC
+
+# Tweet id of twitter.com / x.com status links; 19 digits at most, so it fits an int64
+TWEET_ID_REGEX = r"/status(?:es)?/(\d{1,19})"
+# pic.twitter.com short links point at media, not a tweet: there is no snowflake to decode
+PIC_TWITTER_REGEX = r"^(?:https?://)?pic\.twitter\.com/"
+
 
 def snowflake_to_date(snowflake_id: str) -> str:
     """Convert a Twitter/X snowflake ID to dd-mm-yyyy (UTC)."""
-    twitter_epoch = 1288834974657  # 2010-11-04 01:42:54 UTC
     try:
-        timestamp_ms = (int(snowflake_id) >> 22) + twitter_epoch
+        timestamp_ms = (int(snowflake_id) >> 22) + TWITTER_EPOCH_MS
         dt = datetime.fromtimestamp(timestamp_ms / 1000.0, tz=timezone.utc)
         return dt.strftime("%d-%m-%Y")
     except Exception:
         return None
 
-def extract_dates_from_twitter(df: pd.DataFrame) -> pd.DataFrame:
+
+def snowflake_dates(tweet_ids: pd.Series) -> pd.Series:
+    """Vectorized snowflake_to_date for a Series of tweet id strings (all digits, no NaN)."""
+    ids = tweet_ids.to_numpy(dtype=np.int64)
+    timestamps_ms = (ids >> 22) + TWITTER_EPOCH_MS
+    dates = pd.to_datetime(timestamps_ms, unit="ms", utc=True).strftime("%d-%m-%Y")
+    return pd.Series(dates, index=tweet_ids.index, dtype=object)
+
+
+def extract_dates_from_twitter(df: pd.DataFrame, logger=None) -> pd.DataFrame:
     """
     Update 'date' column for rows with link_type 'twitter' using snowflake IDs.
     Only updates rows where 'date' is missing or empty and 'manually_changed' is not True.
+    All tweet ids are pulled out and decoded in one vectorized pass. pic.twitter.com short
+    links and links without a tweet id are reported per bucket and left without a date.
     """
+    log = lambda msg: logger.info(msg) if logger else print(msg)
+
     # Ensure column exists
     if "manually_changed" not in df.columns:
         df["manually_changed"] = False
 
-    twitter_rows = (
-        (df['link_type'] == 'twitter') &
-        (df['date'].isna() | (df['date'] == "")) &
-        (~df['manually_changed'])
-    )
-    
-    for idx, row in df[twitter_rows].iterrows():
-        try:
-            tweet_id = row['link'].rstrip('/').split('/')[-1]
-            date_str = snowflake_to_date(tweet_id)
-            if date_str:
-                df.at[idx, 'date'] = date_str
-            else:
-                print(f"[{idx}] No date found for {row['link']}")
-        except Exception as e:
-            print(f"[{idx}] Failed {row['link']}: {e}")
-    
+    twitter_rows = (df['link_type'] == 'twitter') & (date_states(df) == "missing")
+    links = df.loc[twitter_rows, "link"].astype(str).str.strip()
+    tweet_ids = links.str.extract(TWEET_ID_REGEX, expand=False).dropna()
+    if len(tweet_ids):
+        set_dates(df, tweet_ids.index, snowflake_dates(tweet_ids))
+
+    no_id = links.drop(tweet_ids.index)
+    pic_links = no_id.str.contains(PIC_TWITTER_REGEX, regex=True)
+    if pic_links.any():
+        log(f"🖼️ pic.twitter.com short links (no tweet id to date): {int(pic_links.sum())}")
+    for idx, link in no_id[~pic_links].items():
+        log(f"[{idx}] No tweet id in {link}")
+
     return df
 
+
 if __name__ == "__main__":
     import pandas as pd
+    from dataset_store import load_losses, write_losses
 
     # Prompt user for CSV file
     csv_path = input("Enter path to CSV to extract Twitter/X dates from: ").strip()
 
     # Load CSV
     try:
-        df = pd.read_csv(csv_path)
+        df = load_losses(csv_path)
     except FileNotFoundError:
         print(f"File not found: {csv_path}")
         exit(1)
@@ -56,7 +76,7 @@ if __name__ == "__main__":
     df = extract_dates_from_twitter(df)
 
     # Save back to the same CSV
-    df.to_csv(csv_path, index=False)
+    write_losses(df, csv_path)
 
     print(f"Twitter/X date extraction completed for '{csv_path}'")
 
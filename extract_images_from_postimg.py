@@ -1,7 +1,15 @@
-import requests
+import hashlib
 from io import BytesIO
 from PIL import Image
 from bs4 import BeautifulSoup
+from http_session import fetch
+from image_cache import get_image_cache
+
+# Decoding straight from the downloaded bytes to an OpenCV array for OCR.
+# DECODE_GRAYSCALE decodes to a single channel (a third of the memory); images above
+# MAX_DECODE_PIXELS are decoded at 1/2, 1/4 or 1/8 size so memory per image stays bounded.
+DECODE_GRAYSCALE = False
+MAX_DECODE_PIXELS = 16_000_000
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) "
@@ -9,20 +17,20 @@ HEADERS = {
                   "Chrome/126.0 Safari/537.36"
 }
 
-def load_postimg_image(url: str) -> Image.Image | None:
+def download_image_bytes(url: str) -> bytes | None:
     """
-    Load an image from a direct URL or a Postimg page URL.
-    Returns a PIL Image object in memory, or None if it fails.
+    Download the raw image bytes for a direct URL or a Postimg page URL.
+    Requests go through the pooled session in http_session (keep-alive, retries with backoff).
+    Returns None if it fails.
     """
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = fetch(url, headers=HEADERS)
         response.raise_for_status()
         content_type = response.headers.get("Content-Type", "")
 
-        # If the response is an image, open directly
+        # If the response is an image, return it directly
         if "image" in content_type:
-            img = Image.open(BytesIO(response.content))
-            return img
+            return response.content
 
         # Otherwise, treat it as an HTML page and parse for the real image
         soup = BeautifulSoup(response.text, "html.parser")
@@ -36,10 +44,9 @@ def load_postimg_image(url: str) -> Image.Image | None:
             img_url = main_img["src"]
 
         if img_url:
-            img_resp = requests.get(img_url, headers=HEADERS, timeout=10)
+            img_resp = fetch(img_url, headers=HEADERS)
             img_resp.raise_for_status()
-            img = Image.open(BytesIO(img_resp.content))
-            return img
+            return img_resp.content
 
         print(f"[WARN] No download link found for {url}")
         return None
@@ -48,6 +55,118 @@ def load_postimg_image(url: str) -> Image.Image | None:
         print(f"Failed to load image from {url}: {e}")
         return None
 
+
+def load_image_bytes(url: str) -> bytes | None:
+    """Image bytes for a URL, from the on-disk image cache (see image_cache) or downloaded."""
+    cache = get_image_cache()
+    content = cache.get(url) if cache else None
+
+    if content is None:
+        content = download_image_bytes(url)
+        if content is not None and cache:
+            cache.put(url, content)
+    return content
+
+
+def load_postimg_image_with_hash(url: str) -> tuple[str | None, Image.Image | None]:
+    """
+    Like load_postimg_image, but also returns the sha256 of the image bytes,
+    which keys the OCR result cache. Returns (None, None) if it fails.
+    """
+    content = load_image_bytes(url)
+    if content is None:
+        return None, None
+
+    try:
+        img = Image.open(BytesIO(content))
+    except Exception as e:
+        print(f"Failed to open image from {url}: {e}")
+        return None, None
+    return hashlib.sha256(content).hexdigest(), img
+
+
+def imdecode_flags(grayscale: bool, reduce: int) -> int:
+    """cv2.imdecode flag for a color/grayscale decode at 1/reduce of the original size."""
+    import cv2
+
+    flags = {
+        (False, 1): cv2.IMREAD_COLOR,
+        (False, 2): cv2.IMREAD_REDUCED_COLOR_2,
+        (False, 4): cv2.IMREAD_REDUCED_COLOR_4,
+        (False, 8): cv2.IMREAD_REDUCED_COLOR_8,
+        (True, 1): cv2.IMREAD_GRAYSCALE,
+        (True, 2): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+        (True, 4): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+        (True, 8): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    }
+    return flags[(grayscale, reduce)]
+
+
+def decode_image(content: bytes, grayscale: bool | None = None):
+    """
+    Decode image bytes directly into an OpenCV array: BGR (h, w, 3), or (h, w) if grayscale.
+
+    Palette, grayscale and RGBA inputs are all converted properly (alpha is dropped).
+    Images larger than MAX_DECODE_PIXELS are decoded at reduced size.
+    Returns None if the bytes are not a decodable image.
+    """
+    import cv2
+    import numpy as np
+
+    if grayscale is None:
+        grayscale = DECODE_GRAYSCALE
+
+    # Only the header is read here, no pixels are decoded
+    reduce = 1
+    try:
+        with Image.open(BytesIO(content)) as header:
+            width, height = header.size
+        while width * height > MAX_DECODE_PIXELS * reduce * reduce and reduce < 8:
+            reduce *= 2
+    except Exception:
+        pass
+
+    # np.frombuffer wraps the bytes without copying them
+    array = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), imdecode_flags(grayscale, reduce))
+    if array is not None:
+        return array
+
+    # Formats this OpenCV build cannot decode (e.g. GIF): go through PIL instead
+    try:
+        with Image.open(BytesIO(content)) as img:
+            pixels = np.asarray(img.convert("L" if grayscale else "RGB"))
+    except Exception:
+        return None
+    return pixels if grayscale else cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+
+
+def load_postimg_array_with_hash(url: str, grayscale: bool | None = None):
+    """
+    Load an image as an OpenCV array ready for OCR, plus the sha256 of its bytes.
+    The downloaded bytes are released as soon as they are decoded.
+    Returns (None, None) if it fails.
+    """
+    content = load_image_bytes(url)
+    if content is None:
+        return None, None
+
+    content_hash = hashlib.sha256(content).hexdigest()
+    array = decode_image(content, grayscale=grayscale)
+    del content
+    if array is None:
+        print(f"Failed to decode image from {url}")
+        return None, None
+    return content_hash, array
+
+
+def load_postimg_image(url: str) -> Image.Image | None:
+    """
+    Load an image from a direct URL or a Postimg page URL.
+    Returns a PIL Image object in memory, or None if it fails.
+    Images are read from the on-disk image cache when present (see image_cache).
+    """
+    return load_postimg_image_with_hash(url)[1]
+
 # --- Test ---
 if __name__ == "__main__":
     test_urls = [
@@ -1,15 +1,93 @@
 from bs4 import BeautifulSoup
+from functools import lru_cache
+from itertools import repeat
 from urllib.parse import urlparse
+import hashlib
+import json
+import lxml.html
+import os
+import pandas as pd
 import re
+import sys
+
+# Available parsing backends for parse_oryx_html.
+# "bs4" is the original BeautifulSoup path, "lxml" walks the lxml tree once.
+PARSER_ENGINES = ("bs4", "lxml")
+
+# Row fields stored per category in the section cache (category and date are implied).
+SECTION_CACHE_FIELDS = ("equipment_type", "loss_type", "link_type", "link")
+
+# Fields of a parsed loss, in CSV column order (the date is added by the later stages).
+# The parser appends every loss to one list per field (LossColumns) instead of building a
+# dict per loss, and interns the equipment, category and loss type text, which repeats a few
+# hundred values over ~25k rows, so all rows share one string object per value.
+LOSS_FIELDS = ("equipment_type", "category", "loss_type", "link_type", "link")
+CATEGORICAL_FIELDS = ("equipment_type", "category", "loss_type", "link_type")
+
+# Patterns, compiled once
+EQUIPMENT_REGEX = re.compile(r"^\d*\s*(.*?):")
+NUMBER_REGEX = re.compile(r"\d+")
+NAVAL_NUMBER_REGEX = re.compile(r"^\s*\d+\s*,?\s*")
+# The netloc of an absolute URL, as urlparse reads it; other links fall back to urlparse
+NETLOC_REGEX = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*://([^/?#]*)")
+
+
+class LossColumns:
+    """Column buffers for parsed losses: one list per field in LOSS_FIELDS."""
+
+    __slots__ = LOSS_FIELDS
+
+    def __init__(self):
+        for field in LOSS_FIELDS:
+            setattr(self, field, [])
+
+    def __len__(self):
+        return len(self.link)
+
+    def __getitem__(self, i):
+        """One loss as a dict, like the rows the parser used to return."""
+        return dict({field: getattr(self, field)[i] for field in LOSS_FIELDS}, date="")
+
+    def append(self, equipment_type, category, loss_type, link_type, link, count=1):
+        """Add `count` identical losses."""
+        for field, value in zip(LOSS_FIELDS, (equipment_type, category, loss_type, link_type, link)):
+            getattr(self, field).extend(repeat(value, count))
+
+    def extend(self, other):
+        for field in LOSS_FIELDS:
+            getattr(self, field).extend(getattr(other, field))
+
+    def rows(self, start=0, stop=None):
+        """The losses as dicts (for tests and debugging; the pipeline uses to_frame)."""
+        return [self[i] for i in range(start, len(self) if stop is None else stop)]
+
+    def to_frame(self) -> pd.DataFrame:
+        """The losses as a DataFrame in CSV column order, with the repeated text columns categorical."""
+        columns = {
+            field: pd.Categorical(values) if field in CATEGORICAL_FIELDS else pd.array(values, dtype="str")
+            for field in LOSS_FIELDS
+            for values in [getattr(self, field)]
+        }
+        return pd.DataFrame(columns).assign(date="")
+
+
+def link_domain(link: str) -> str:
+    match = NETLOC_REGEX.match(link)
+    return match.group(1) if match else urlparse(link).netloc
 
-from urllib.parse import urlparse
 
 def classify_link(link: str) -> str:
     """
     Classify a URL as one of the known link types.
     Returns 'twitter', 'postimg', 'postlmg', 'imgur', or 'other'.
     """
-    domain = urlparse(link).netloc.lower()  # lowercase for consistency
+    return classify_domain(link_domain(link))
+
+
+@lru_cache(maxsize=None)
+def classify_domain(domain: str) -> str:
+    """Link type of a URL domain; cached, the ~25k links of a page share a handful of domains."""
+    domain = domain.lower()  # lowercase for consistency
 
     if "twitter.com" in domain or "x.com" in domain:
         return "twitter"
@@ -41,84 +119,246 @@ def get_category_h3_tags(soup, start_category="Tanks"):
         if start_collecting:
             yield h
 
-def parse_li_item(li, category):
+def parse_li_item(li, category, columns=None):
     """Parse a single <li> element into multiple loss entries.
 
     If category contains 'Naval', each bracketed <a> is one loss entry.
     Otherwise, normal counting logic applies.
+    The losses are appended to `columns` (a new LossColumns if None), which is returned.
     """
     li_text = li.get_text(" ", strip=True)
+    anchors = [(a.get("href", ""), a.get_text(strip=True)) for a in li.find_all("a")]
+    return build_loss_entries(li_text, anchors, category, columns)
+
+
+def build_loss_entries(li_text, anchors, category, columns=None):
+    """Append the losses of an <li>, given its text and (href, text) anchors, to `columns`.
+
+    Shared by the BeautifulSoup and lxml engines so both count losses the same way.
+    """
+    if columns is None:
+        columns = LossColumns()
 
     # Extract equipment type (ignore number in front)
-    equip_match = re.match(r"^\d*\s*(.*?):", li_text)
+    equip_match = EQUIPMENT_REGEX.match(li_text)
     if not equip_match:
-        return []
+        return columns
 
-    equipment_type = equip_match.group(1).strip()
-    losses = []
+    equipment_type = sys.intern(equip_match.group(1).strip())
+    naval = "naval" in category.lower()
 
     # Loop over each <a> tag
-    for a in li.find_all("a"):
-        link = a.get("href", "")
+    for link, anchor_text in anchors:
         link_type = classify_link(link)
 
-        bracket_text = a.get_text(strip=True).strip("()")
+        bracket_text = anchor_text.strip("()")
 
         # ----- Branch logic -----
-        if "naval" in category.lower():
+        if naval:
             # Naval: 1 loss per <a>, remove first number + comma/space
-            loss_type = re.sub(r"^\s*\d+\s*,?\s*", "", bracket_text).strip()
-            numbers = ["1"]  # just one entry per bracket
+            loss_type = NAVAL_NUMBER_REGEX.sub("", bracket_text).strip()
+            count = 1  # just one entry per bracket
         else:
             # Normal categories: count all numbers in the bracket
-            all_numbers = list(re.finditer(r"\d+", bracket_text))
+            all_numbers = list(NUMBER_REGEX.finditer(bracket_text))
             if all_numbers:
-                last_num_match = all_numbers[-1]
                 # Everything after the last number is the loss_type
-                loss_type = bracket_text[last_num_match.end():].strip(" ,")
-                num_text = bracket_text[:last_num_match.end()]
-                numbers = re.findall(r"\d+", num_text)
+                loss_type = bracket_text[all_numbers[-1].end():].strip(" ,")
+                count = len(all_numbers)
             else:
                 # If no number, just 1 loss
                 loss_type = bracket_text.strip()
-                numbers = ["1"]
+                count = 1
         # ----- Build entries -----
-        for _ in numbers:
-            losses.append({
-                "equipment_type": equipment_type,
-                "category": category,
-                "loss_type": loss_type,
-                "link_type": link_type,
-                "link": link,
-                "date": ""  # placeholder
-            })
+        columns.append(equipment_type, category, sys.intern(loss_type), link_type, link, count)
+
+    return columns
 
-    return losses
 
+def parse_category_header(h3_text):
+    """Split an <h3> header like 'Tanks (4389, of which ...)' into ('Tanks', 4389)."""
+    category = sys.intern(h3_text.split("(")[0].strip())
+    category_amount = int(re.search(r"\d+", h3_text).group())
+    return category, category_amount
 
-def parse_category(h3_tag):
-    """Parse all <li> items under a given <h3> category tag."""
-    category = h3_tag.get_text(strip=True).split("(")[0].strip()
-    category_amount = int(re.search(r"\d+", h3_tag.get_text(strip=True)).group())
-    category_losses = []
 
+def category_siblings(h3_tag):
+    """Yield the tags belonging to a category: every sibling up to the next <h3>."""
     for sib in h3_tag.find_next_siblings():
         if sib.name == "h3":
             break
-        for li in BeautifulSoup(str(sib), "lxml").find_all("li"):
-            category_losses.extend(parse_li_item(li, category))
+        yield sib
+
+
+def parse_category(h3_tag, columns=None, digest=None):
+    """Parse all <li> items under a given <h3> category tag into `columns` (a new LossColumns if None).
+
+    If `digest` is given, the section HTML is fed to it as well (see section_fingerprint).
+    """
+    category, category_amount = parse_category_header(h3_tag.get_text(strip=True))
+    if columns is None:
+        columns = LossColumns()
 
-    #print(f"Category: {category}, category_amount_oryx: {category_amount}", "items parsed: ", len(category_losses))
-    return category_losses
+    for sib in category_siblings(h3_tag):
+        html = str(sib)
+        if digest is not None:
+            digest.update(html.encode("utf-8"))
+        for li in BeautifulSoup(html, "lxml").find_all("li"):
+            parse_li_item(li, category, columns)
 
+    #print(f"Category: {category}, category_amount_oryx: {category_amount}", "items parsed: ", len(columns))
+    return columns
 
-def parse_oryx_html(file_path, start_category="Tanks"):
-    """Main function: parse HTML and return all losses starting from a category."""
-    soup = load_html(file_path)
-    all_losses = []
 
-    for h3_tag in get_category_h3_tags(soup, start_category=start_category):
-        h3_text = h3_tag.get_text(strip=True)
+def lxml_text(element, separator=""):
+    """Mimic BeautifulSoup's get_text(separator, strip=True) for an lxml element."""
+    return separator.join(t.strip() for t in element.itertext() if t.strip())
+
+
+def load_html_lxml(file_path="oryx.html"):
+    """Load the HTML file and return the lxml root element."""
+    with open(file_path, "r", encoding="utf-8") as file:
+        html_content = file.read()
+    return lxml.html.document_fromstring(html_content)
+
+
+def get_category_h3_tags_lxml(root, start_category="Tanks"):
+    """lxml counterpart of get_category_h3_tags."""
+    start_collecting = False
+    for h in root.iter("h3"):
+        if lxml_text(h).startswith(start_category):
+            start_collecting = True
+        if start_collecting:
+            yield h
+
+
+def parse_li_item_lxml(li, category, columns=None):
+    """lxml counterpart of parse_li_item."""
+    li_text = lxml_text(li, " ")
+    anchors = [(a.get("href", ""), lxml_text(a)) for a in li.iter("a")]
+    return build_loss_entries(li_text, anchors, category, columns)
+
+
+def category_siblings_lxml(h3_tag):
+    """lxml counterpart of category_siblings."""
+    for sib in h3_tag.itersiblings():
+        if not isinstance(sib.tag, str):
+            continue  # comments / processing instructions
+        if sib.tag == "h3":
+            break
+        yield sib
+
+
+def parse_category_lxml(h3_tag, columns=None, digest=None):
+    """Parse all <li> items under an <h3> category in a single pass over the lxml tree."""
+    category, _ = parse_category_header(lxml_text(h3_tag))
+    if columns is None:
+        columns = LossColumns()
+
+    for sib in category_siblings_lxml(h3_tag):
+        if digest is not None:
+            digest.update(lxml.html.tostring(sib, encoding="utf-8"))
+        for li in sib.iter("li"):
+            parse_li_item_lxml(li, category, columns)
+
+    return columns
+
+
+def section_fingerprint(h3_tag, engine="bs4"):
+    """sha256 of the serialized HTML of a category section (everything after its <h3>)."""
+    digest = hashlib.sha256()
+    if engine == "lxml":
+        for sib in category_siblings_lxml(h3_tag):
+            digest.update(lxml.html.tostring(sib, encoding="utf-8"))
+    else:
+        for sib in category_siblings(h3_tag):
+            digest.update(str(sib).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_section_cache(cache_path, engine):
+    """Load the per-category section cache, or an empty one if missing or built by another engine."""
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    with open(cache_path, "r", encoding="utf-8") as f:
+        cache = json.load(f)
+    # Fingerprints are engine specific (different serializers)
+    if cache.get("engine") != engine:
+        return {}
+    return cache.get("sections", {})
+
+
+def save_section_cache(cache_path, engine, sections):
+    """Write the per-category section cache as compact JSON."""
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({"engine": engine, "sections": sections}, f, separators=(",", ":"))
+
+
+def parse_category_cached(h3_tag, h3_text, parse, engine, cache, columns):
+    """Append one category's losses to `columns`, reusing cached rows if unchanged.
+    Returns (section_entry, reused).
+
+    The '(N)' header count is checked first since it is free: a new section or one whose
+    count changed is reparsed straight away, and hashed while it is parsed (for the next
+    run). The section hash catches edits that leave the count untouched.
+    """
+    category, category_amount = parse_category_header(h3_text)
+    cached = cache.get(category)
+    count_matches = bool(cached) and cached["amount"] == category_amount
+    fingerprint = section_fingerprint(h3_tag, engine=engine) if count_matches else None
+    start = len(columns)
+
+    if count_matches and cached["hash"] == fingerprint:
+        for equipment_type, loss_type, link_type, link in cached["rows"]:
+            columns.append(sys.intern(equipment_type), category, sys.intern(loss_type), sys.intern(link_type), link)
+        reused = True
+    elif fingerprint is not None:
+        parse(h3_tag, columns)
+        reused = False
+    else:
+        digest = hashlib.sha256()
+        parse(h3_tag, columns, digest)
+        fingerprint = digest.hexdigest()
+        reused = False
+
+    entry = {
+        "amount": category_amount,
+        "hash": fingerprint,
+        "rows": [list(row) for row in zip(*(getattr(columns, field)[start:] for field in SECTION_CACHE_FIELDS))],
+    }
+    return entry, reused
+
+
+def parse_oryx_html(file_path, start_category="Tanks", engine="bs4", section_cache=None, logger=None):
+    """Main function: parse HTML and return all losses starting from a category, as a DataFrame
+    (see LossColumns.to_frame).
+
+    engine selects the backend: "bs4" (BeautifulSoup) or "lxml" (single-pass lxml tree walk).
+    Both return identical rows.
+
+    If section_cache is a file path, each category section is fingerprinted and only
+    sections whose '(N)' count or content hash changed are reparsed. Rows of unchanged
+    sections are taken from the cache, which is rewritten afterwards.
+    """
+    if engine not in PARSER_ENGINES:
+        raise ValueError(f"Unknown parser engine '{engine}', expected one of {PARSER_ENGINES}")
+
+    if engine == "lxml":
+        root = load_html_lxml(file_path)
+        h3_tags = get_category_h3_tags_lxml(root, start_category=start_category)
+        get_text, parse = lxml_text, parse_category_lxml
+    else:
+        soup = load_html(file_path)
+        h3_tags = get_category_h3_tags(soup, start_category=start_category)
+        get_text, parse = (lambda h: h.get_text(strip=True)), parse_category
+
+    cache = load_section_cache(section_cache, engine) if section_cache else None
+    new_sections = {}
+    reused_count = 0
+    all_losses = LossColumns()
+
+    for h3_tag in h3_tags:
+        h3_text = get_text(h3_tag)
 
         # Skip empty <h3> tags
         if not h3_text:
@@ -128,7 +368,24 @@ def parse_oryx_html(file_path, start_category="Tanks"):
         if not re.search(r"\(\d", h3_text):
             break
 
-        all_losses.extend(parse_category(h3_tag))
+        if cache is None:
+            parse(h3_tag, all_losses)
+            continue
+
+        entry, reused = parse_category_cached(h3_tag, h3_text, parse, engine, cache, all_losses)
+        new_sections[parse_category_header(h3_text)[0]] = entry
+        reused_count += reused
 
-    return all_losses
+    if cache is not None:
+        save_section_cache(section_cache, engine, new_sections)
+        msg = (
+            f"Parsed {len(new_sections)} categories | "
+            f"Reused {reused_count} unchanged from {section_cache} | "
+            f"Reparsed {len(new_sections) - reused_count}"
+        )
+        if logger:
+            logger.info(msg)
+        else:
+            print(msg)
 
+    return all_losses.to_frame()
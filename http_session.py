@@ -0,0 +1,115 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from worker_limits import http_slot, http_slot_released
+
+# Separate connect / read timeouts (seconds)
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 20
+
+# Longest a retry sleeps (seconds), also when the server asks for more with Retry-After
+MAX_RETRY_SLEEP = 10
+
+class BudgetRetry(Retry):
+    """
+    Retry that hands its HTTP budget slot (worker_limits.http_slot) back while it backs off,
+    and waits at most MAX_RETRY_SLEEP however long a Retry-After header asks for.
+    """
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, MAX_RETRY_SLEEP)
+
+    def sleep(self, response=None):
+        with http_slot_released():
+            super().sleep(response)
+
+
+# Retries with jittered exponential backoff: sleeps ~0.5s, 1s, 2s (+ up to 0.5s jitter)
+RETRY = BudgetRetry(
+    total=3,
+    connect=3,
+    read=2,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET", "HEAD"]),
+    backoff_factor=0.5,
+    backoff_jitter=0.5,
+    backoff_max=MAX_RETRY_SLEEP,
+    respect_retry_after_header=True,
+    raise_on_status=False,  # hand back the last response, callers use raise_for_status()
+)
+
+# Keep-alive connections kept per host, shared by all download threads
+# (extract_dates_from_images uses 4 by default)
+POOL_SIZE = 8
+
+
+class LatencyStats:
+    """Thread-safe running totals of request latency, to see how much of a run is network time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.count = 0
+            self.failures = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def record(self, seconds, failed=False):
+        with self.lock:
+            self.count += 1
+            self.failures += failed
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def summary(self):
+        with self.lock:
+            avg = self.total / self.count if self.count else 0.0
+            return (
+                f"{self.count} requests ({self.failures} failed) | "
+                f"network time {self.total:.1f}s | avg {avg:.2f}s | max {self.max:.2f}s"
+            )
+
+
+LATENCY = LatencyStats()
+
+# One session per process, shared by all threads. Only GETs go through it and nothing on the
+# session (headers, cookies, adapters) is changed after it is made; the connection pool behind
+# it (urllib3) is thread-safe, so every thread reuses the same keep-alive connections.
+session = None
+session_lock = threading.Lock()
+
+
+def make_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=RETRY, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use."""
+    global session
+    with session_lock:
+        if session is None:
+            session = make_session()
+        return session
+
+
+def fetch(url, headers=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+    """GET a URL through the pooled, retrying session and record its latency."""
+    start = time.perf_counter()
+    failed = True
+    try:
+        with http_slot():
+            response = get_session().get(url, headers=headers, timeout=timeout)
+        failed = not response.ok
+        return response
+    finally:
+        LATENCY.record(time.perf_counter() - start, failed=failed)
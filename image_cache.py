@@ -0,0 +1,142 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# On-disk cache for downloaded postimg images, so reruns and OCR tuning read from disk.
+# Blobs are stored once per content hash; an SQLite index maps URLs to hashes and
+# tracks last access for LRU eviction once the cache grows past max_bytes.
+DEFAULT_CACHE_DIR = ".image_cache"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GB
+
+
+class ImageCache:
+    """Content-addressed image cache keyed by URL and sha256, capped in bytes with LRU eviction."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        # One connection shared by the prefetch threads (guarded by self.lock);
+        # the timeout lets concurrent dataset processes wait for each other's writes.
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), timeout=30, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL REFERENCES blobs(sha256)
+            );
+            CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs(last_access);
+            CREATE INDEX IF NOT EXISTS urls_sha256 ON urls(sha256);
+        """)
+        self.db.commit()
+
+    def blob_path(self, sha256):
+        return os.path.join(self.cache_dir, sha256[:2], sha256)
+
+    def get(self, url):
+        """Return the cached bytes for a URL, or None on a miss."""
+        with self.lock:
+            row = self.db.execute("SELECT sha256 FROM urls WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            sha256 = row[0]
+            try:
+                with open(self.blob_path(sha256), "rb") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                # Blob removed behind our back: forget it
+                self.forget(sha256)
+                self.db.commit()
+                return None
+            self.db.execute("UPDATE blobs SET last_access = ? WHERE sha256 = ?", (time.time(), sha256))
+            self.db.commit()
+            return content
+
+    def put(self, url, content):
+        """Store bytes for a URL (once per content hash), then evict down to max_bytes."""
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self.blob_path(sha256)
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            self.db.execute(
+                "INSERT INTO blobs (sha256, size, last_access) VALUES (?, ?, ?) "
+                "ON CONFLICT(sha256) DO UPDATE SET last_access = excluded.last_access",
+                (sha256, len(content), time.time())
+            )
+            self.db.execute(
+                "INSERT INTO urls (url, sha256) VALUES (?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET sha256 = excluded.sha256",
+                (url, sha256)
+            )
+            self.evict()
+            self.db.commit()
+        return sha256
+
+    def total_bytes(self):
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def forget(self, sha256):
+        """Drop a blob and every URL pointing at it. Caller holds the lock."""
+        self.db.execute("DELETE FROM urls WHERE sha256 = ?", (sha256,))
+        self.db.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+        try:
+            os.remove(self.blob_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Remove least recently used blobs until the cache fits in max_bytes. Caller holds the lock."""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for sha256, size in self.db.execute(
+            "SELECT sha256, size FROM blobs ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self.forget(sha256)
+            total -= size
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+# Process-wide cache used by load_postimg_image, created on first use
+DEFAULT_CACHE = None
+default_cache_lock = threading.Lock()
+cache_settings = {"cache_dir": DEFAULT_CACHE_DIR, "max_bytes": DEFAULT_MAX_BYTES, "enabled": True}
+
+
+def configure_image_cache(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+    """Change where and how much the default cache stores, or disable it."""
+    global DEFAULT_CACHE
+    with default_cache_lock:
+        if DEFAULT_CACHE is not None:
+            DEFAULT_CACHE.close()
+        DEFAULT_CACHE = None
+        cache_settings.update(cache_dir=cache_dir, max_bytes=max_bytes, enabled=enabled)
+
+
+def get_image_cache():
+    """Return the process-wide ImageCache, or None if caching is disabled."""
+    global DEFAULT_CACHE
+    if not cache_settings["enabled"]:
+        return None
+    with default_cache_lock:
+        if DEFAULT_CACHE is None:
+            DEFAULT_CACHE = ImageCache(cache_settings["cache_dir"], cache_settings["max_bytes"])
+        return DEFAULT_CACHE
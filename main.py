@@ -1,27 +1,41 @@
-import pandas as pd
+import argparse
 import logging
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from html_parser import parse_oryx_html
 from write_csv import write_losses_csv
-from merge_losses import merge_with_most_recent
+from merge_losses import MERGE_MODES, merge_with_most_recent
 from extract_dates import extract_dates
-from download_html import download_html
+from download_html import download_html, mark_snapshot_processed, snapshot_processed
+from dataset_store import STORE_FORMATS, export_csv, import_csv_if_newer, read_losses, store_path_for, write_losses
+from worker_limits import cpu_threads_per_job, init_worker
 
 DATASETS = {
     "1": {
         "name": "Russian losses",
         "url": "https://www.oryxspioenkop.com/2022/02/attack-on-europe-documenting-equipment.html",
         "csv": "russian_losses_with_dates.csv",
-        "html_file": "russian_losses.html"
+        "recent_csv": "russian_most_recent_losses.csv",
+        "html_file": "russian_losses.html",
+        "section_cache": "russian_losses_sections.json"
     },
     "2": {
         "name": "Ukrainian losses",
         "url": "https://www.oryxspioenkop.com/2022/02/attack-on-europe-documenting-ukrainian.html",
         "csv": "ukrainian_losses_with_dates.csv",
-        "html_file": "ukrainian_losses.html"
+        "recent_csv": "ukrainian_most_recent_losses.csv",
+        "html_file": "ukrainian_losses.html",
+        "section_cache": "ukrainian_losses_sections.json"
     }
 }
 
+# Maximum number of HTTP requests in flight over all dataset workers together
+HTTP_BUDGET = 4
+
+# HTML parsing backend, see html_parser.PARSER_ENGINES ("bs4" or "lxml")
+PARSER_ENGINE = "lxml"
+
 def setup_logger(name, log_file):
     """
     Creates a dedicated logger for a dataset, writing to a file and console,
@@ -48,40 +62,122 @@ def setup_logger(name, log_file):
 
     return logger
 
-def process_dataset(dataset):
+def process_dataset(dataset, ocr_workers=1, ocr_batch_size=1, store_format="csv", merge_mode="append"):
     print(f"Processing {dataset['name']}")
     logger = setup_logger(dataset['name'], f"{dataset['name'].replace(' ', '_')}.log")
 
+    # Working copy of the dataset: the CSV itself, or a typed store exported to the CSV at the end
+    store = store_path_for(dataset["csv"], store_format)
+    if import_csv_if_newer(dataset["csv"], store):
+        logger.info(f"Imported {dataset['csv']} into {store}")
+
     # 2️⃣ Download HTML
     logger.info(f"Downloading HTML from {dataset['url']}")
     download_html(dataset["url"], dataset["html_file"])
+    # Skip only when the last run completed on this snapshot; an interrupted run (merge,
+    # date extraction or OCR, whose journal is replayed) is picked up again
+    if snapshot_processed(dataset["html_file"]) and os.path.exists(store):
+        logger.info(f"Oryx page unchanged since last completed run, skipping {dataset['name']}")
+        return
     logger.info(f"Saved HTML to {dataset['html_file']}")
 
     # 3️⃣ Parse HTML
     logger.info("Parsing HTML and copying most recently updated Oryx data to csv")
-    losses = parse_oryx_html(file_path=dataset["html_file"])
-    write_losses_csv(losses)
+    losses = parse_oryx_html(
+        file_path=dataset["html_file"],
+        engine=PARSER_ENGINE,
+        section_cache=dataset["section_cache"],
+        logger=logger
+    )
+    write_losses_csv(losses, filename=dataset["recent_csv"])
 
     # 4️⃣ Merge with existing CSV if exists
-    if not os.path.exists(dataset["csv"]):
-        logger.info(f"No existing CSV found at {dataset['csv']}, creating new one.")
-        os.rename("most_recent_losses.csv", dataset["csv"])
+    if not os.path.exists(store):
+        logger.info(f"No existing CSV found at {store}, creating new one.")
+        if store == dataset["csv"]:
+            os.rename(dataset["recent_csv"], store)
+        else:
+            write_losses(read_losses(dataset["recent_csv"]), store)
+            os.remove(dataset["recent_csv"])
     else:
-        logger.info(f"Merging most recent losses into {dataset['csv']}")
-        merge_with_most_recent(dataset["csv"], "most_recent_losses.csv", logger=logger)
+        logger.info(f"Merging most recent losses into {store}")
+        merge_with_most_recent(store, dataset["recent_csv"], logger=logger, mode=merge_mode)
         logger.info("Merge completed")
 
     # 5️⃣ Run date extraction (existing dates preserved)
     logger.info("Running date extraction...")
-    extract_dates(dataset["csv"], logger=logger)
+    extract_dates(store, logger=logger, ocr_workers=ocr_workers, ocr_batch_size=ocr_batch_size)
     logger.info("Date extraction completed")
 
+    # 6️⃣ Publish the store as CSV
+    if store != dataset["csv"]:
+        export_csv(store, dataset["csv"])
+        logger.info(f"Exported {store} to {dataset['csv']}")
+
+    mark_snapshot_processed(dataset["html_file"])
+
+
+def run_concurrently(datasets, jobs, ocr_workers=1, ocr_batch_size=1, store_format="csv", merge_mode="append"):
+    """Run each dataset pipeline in its own worker process.
+
+    CPUs are split evenly over the workers so the EasyOCR/torch threads of two runs
+    do not oversubscribe the machine, and all workers share one HTTP budget.
+    Workers are spawned rather than forked, forking after torch is loaded is unsafe.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    http_slots = ctx.Semaphore(HTTP_BUDGET)
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=ctx,
+        initializer=init_worker,
+        initargs=(cpu_threads_per_job(jobs), http_slots)
+    ) as pool:
+        futures = {pool.submit(process_dataset, dataset, ocr_workers, ocr_batch_size, store_format, merge_mode): dataset for dataset in datasets}
+        for future in as_completed(futures):
+            future.result()  # re-raise worker errors
+            print(f"Finished {futures[future]['name']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape Oryx losses and extract dates.")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="number of datasets to process concurrently, each in its own process (default: 1, sequential)"
+    )
+    parser.add_argument(
+        "--ocr-workers", type=int, default=1,
+        help="OCR worker processes per dataset, each with its own EasyOCR reader (default: 1, in-process)"
+    )
+    parser.add_argument(
+        "--ocr-batch-size", type=int, default=1,
+        help="images per OCR call; same-size images share one EasyOCR detection batch (default: 1)"
+    )
+    parser.add_argument(
+        "--store", choices=STORE_FORMATS, default="csv",
+        help="keep each dataset as CSV, or in a typed Parquet file that is exported to the CSV after every run (default: csv)"
+    )
+    parser.add_argument(
+        "--merge", choices=MERGE_MODES, default="append",
+        help="append: add the rows missing per link; links: only add rows with new links; changes: also apply Oryx edits to existing links, keeping their dates (default: append)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    datasets = [DATASETS[key] for key in DATASETS]
+    jobs = max(1, min(args.jobs, len(datasets)))
+
+    if jobs > 1:
+        # --- Run datasets concurrently ---
+        run_concurrently(datasets, jobs, ocr_workers=args.ocr_workers, ocr_batch_size=args.ocr_batch_size, store_format=args.store,
+                         merge_mode=args.merge)
+        return
 
-def main():
     # --- Run both datasets sequentially ---
-    for key in DATASETS:
-        dataset = DATASETS[key]
-        process_dataset(dataset)
+    for dataset in datasets:
+        process_dataset(dataset, ocr_workers=args.ocr_workers, ocr_batch_size=args.ocr_batch_size, store_format=args.store,
+                        merge_mode=args.merge)
 
     # --- Interactive choice (commented out for future use) ---
     # print("Select dataset to process:")
@@ -1,9 +1,143 @@
 import pandas as pd
 import os
+from dataset_store import append_losses, insert_new_links, link_counts, read_losses, write_losses
 
-def merge_with_most_recent(existing_csv, recent_csv="most_recent_losses.csv", logger=None):
+# Merge modes:
+# "append"  - append the rows the dataset is missing per link, e.g. a second hull added to
+#             an existing link; existing rows are never touched or rewritten (default)
+# "links"   - add rows whose link is new, never touch existing rows
+# "changes" - also pick up edits Oryx made to rows of existing links (see merge_changes)
+MERGE_MODES = ("append", "links", "changes")
+
+# What identifies a row of the Oryx list; date and manually_changed are ours
+FINGERPRINT_COLUMNS = ["equipment_type", "category", "loss_type", "link"]
+
+
+def row_fingerprints(df):
+    """One uint64 hash per row over FINGERPRINT_COLUMNS."""
+    return pd.util.hash_pandas_object(df[FINGERPRINT_COLUMNS].fillna("").astype(str), index=False)
+
+
+def occurrence_keys(df, fingerprints):
+    """link, fingerprint and n-th occurrence per row, so identical rows of one link are matched one to one."""
+    return pd.DataFrame({
+        "link": df["link"].to_numpy(),
+        "fp": fingerprints.to_numpy(),
+        "occurrence": fingerprints.groupby([df["link"], fingerprints]).cumcount().to_numpy(),
+    }, index=df.index)
+
+
+def missing_rows(df_new, counts):
+    """
+    Rows of the scrape the dataset does not have yet: for each link, the rows past the number
+    of rows the dataset already has for it (`counts`: link -> rows), in scrape order.
+    """
+    have = df_new["link"].map(counts).fillna(0)
+    occurrence = df_new.groupby("link", sort=False).cumcount()
+    return df_new[(occurrence >= have).to_numpy()]
+
+
+def merge_changes(df_existing, df_new, drop_removed=False):
+    """
+    Merge a fresh scrape into the dataset, picking up changes to existing links.
+
+    Each link's rows are compared as a multiset of (equipment_type, category, loss_type, link)
+    fingerprints. Links whose multiset is unchanged keep their rows as they are.
+    Links whose multiset changed get the scraped rows in place of their old rows
+    (at the position of the first old row), each keeping the date and manually_changed
+    of the old row with the same fingerprint. Edited rows take the values of the link's
+    unmatched old rows in order. Rows past those are new: they get the date of the link's
+    first old row (the date belongs to the image or post the link points to) and are not
+    marked as manually changed. New links are appended.
+    Links that are gone from the scrape are kept, unless drop_removed=True.
+
+    Returns (merged DataFrame, stats dict).
+    """
+    df_existing = df_existing.reset_index(drop=True)
+    df_new = df_new.reset_index(drop=True)
+    old_fp = row_fingerprints(df_existing)
+    new_fp = row_fingerprints(df_new)
+    old_links = pd.Index(df_existing["link"].unique())
+    new_links = pd.Index(df_new["link"].unique())
+
+    # Per (link, fingerprint) row counts; a link changed if any of its counts differ
+    counts = pd.concat([
+        pd.DataFrame({"link": df_existing["link"], "fp": old_fp}).value_counts().rename("old"),
+        pd.DataFrame({"link": df_new["link"], "fp": new_fp}).value_counts().rename("new"),
+    ], axis=1).fillna(0)
+    differing = counts.index[counts["old"] != counts["new"]].get_level_values("link").unique()
+    changed_links = differing.intersection(old_links).intersection(new_links)
+    removed_links = old_links.difference(new_links)
+
+    old_rows_to_replace = df_existing["link"].isin(changed_links)
+    if drop_removed:
+        old_rows_to_replace |= df_existing["link"].isin(removed_links)
+    keep = df_existing[~old_rows_to_replace].copy()
+    keep["position"], keep["order"] = keep.index, 0
+
+    # Rows of changed links, carrying over date / manually_changed from matching old rows
+    first_old_row = df_existing.reset_index().drop_duplicates("link").set_index("link")
+    scraped = df_new["link"].isin(changed_links)
+    replaced = df_new[scraped].copy()
+    old_values = occurrence_keys(df_existing, old_fp).assign(
+        date=df_existing["date"], manually_changed=df_existing["manually_changed"]
+    )
+    new_keys = occurrence_keys(replaced, new_fp[scraped])
+    carried = new_keys.merge(old_values, on=["link", "fp", "occurrence"], how="left", indicator=True)
+    matched = (carried["_merge"] == "both").to_numpy()
+    # Edited rows take the values of the link's old rows that lost their match, in order;
+    # only the rows past those are new
+    unmatched_old = old_values.merge(new_keys, on=["link", "fp", "occurrence"], how="left", indicator=True)
+    unmatched_old = unmatched_old[(unmatched_old["_merge"] == "left_only") & unmatched_old["link"].isin(changed_links)]
+    unmatched_old = unmatched_old.assign(rank=unmatched_old.groupby("link").cumcount())
+    rank = carried.groupby(["link", pd.Series(matched)]).cumcount().where(~matched, -1)
+    edited = carried[["link"]].assign(rank=rank).merge(
+        unmatched_old[["link", "rank", "date", "manually_changed"]], on=["link", "rank"], how="left", indicator=True
+    )
+    was_edited = (edited["_merge"] == "both").to_numpy()
+    link_date = replaced["link"].map(first_old_row["date"]).to_numpy()
+    replaced["date"] = (
+        pd.Series(carried["date"].to_numpy(), dtype=object)
+        .where(matched, pd.Series(edited["date"].to_numpy(), dtype=object).where(was_edited, link_date))
+        .to_numpy()
+    )
+    replaced["manually_changed"] = (
+        pd.Series(carried["manually_changed"].to_numpy(), dtype=object)
+        .where(matched, pd.Series(edited["manually_changed"].to_numpy(), dtype=object).where(was_edited, False))
+        .astype("boolean").fillna(False).to_numpy(dtype=bool)
+    )
+    replaced["position"] = replaced["link"].map(first_old_row["index"])
+    replaced["order"] = range(1, len(replaced) + 1)
+
+    # Links Oryx added since the last run go at the end
+    added = df_new[~df_new["link"].isin(old_links)].copy()
+    added["position"], added["order"] = len(df_existing), range(len(added))
+
+    merged = (
+        pd.concat([keep, replaced, added])
+        .sort_values(["position", "order"], kind="stable")
+        .drop(columns=["position", "order"])
+        .reset_index(drop=True)
+    )
+    stats = {
+        "changed_links": len(changed_links),
+        "replaced_rows": int(old_rows_to_replace.sum()),
+        "updated_rows": len(replaced),
+        "added_rows": len(added),
+        "removed_links": len(removed_links),
+    }
+    return merged, stats
+
+
+def merge_with_most_recent(existing_csv, recent_csv="most_recent_losses.csv", logger=None, mode="append", drop_removed=False):
     """
     Merge new rows from `recent_csv` into `existing_csv`, using 'link' as key.
+    `existing_csv` may also be a Parquet or SQLite store (see dataset_store). An SQLite
+    store only gets the new rows inserted instead of being rewritten.
+    With mode="append" (the default), a link that has more rows on Oryx than in the dataset
+    gets the extra rows too, and they are appended to the end of the existing file
+    using a persisted link-count index instead of reading and rewriting it (see dataset_store.link_counts).
+    With mode="changes", edits to rows of existing links are applied too (see merge_changes).
 
     Rules:
     - Keep ALL rows from the existing CSV.
@@ -12,27 +146,52 @@ def merge_with_most_recent(existing_csv, recent_csv="most_recent_losses.csv", lo
     - After merging, overwrite the existing CSV and delete the recent CSV.
 
     caveat:
-    if Oryx changes an entry with an old link, the change will NOT be reflected.
+    if Oryx changes an entry with an old link, the change will NOT be reflected (unless mode="changes").
     If you want to be sure to get all changes, delete the existing CSV first.
     However, running the OCR on the entire csv can take a long time (hours) depending on your hardware.
     REDO manual changes if you delete the existing CSV.
     """
-    # Load both datasets
-    df_existing = pd.read_csv(existing_csv)
     df_new = pd.read_csv(recent_csv)
-
-    # Ensure 'link' column exists
-    if "link" not in df_existing.columns or "link" not in df_new.columns:
+    if "link" not in df_new.columns:
         raise ValueError("Both CSV files must contain a 'link' column")
 
-    # Find new rows by link
-    new_rows = df_new[~df_new["link"].isin(df_existing["link"])]
+    if mode == "append":
+        new_rows = missing_rows(df_new, link_counts(existing_csv))
+        append_losses(new_rows, existing_csv)
+        added = len(new_rows)
+        total = sum(link_counts(existing_csv).values())
+    elif mode == "changes":
+        df_merged, stats = merge_changes(read_losses(existing_csv), df_new, drop_removed=drop_removed)
+        write_losses(df_merged, existing_csv)
+        added, total = stats["added_rows"], len(df_merged)
+        msg = (
+            f"Changed links: {stats['changed_links']} | "
+            f"{stats['replaced_rows']} rows replaced by {stats['updated_rows']} updated rows (dates carried over) | "
+            f"Links no longer on Oryx: {stats['removed_links']}{' (dropped)' if drop_removed else ''}"
+        )
+        if logger:
+            logger.info(msg)
+        else:
+            print(msg)
+    elif existing_csv.endswith(".sqlite"):
+        # Indexed insert of the rows with new links, nothing else is rewritten
+        added, total = insert_new_links(existing_csv, df_new)
+    else:
+        df_existing = read_losses(existing_csv)
+
+        # Ensure 'link' column exists
+        if "link" not in df_existing.columns:
+            raise ValueError("Both CSV files must contain a 'link' column")
+
+        # Find new rows by link
+        new_rows = df_new[~df_new["link"].isin(df_existing["link"])]
 
-    # Merge: always keep all old rows, add only truly new rows
-    df_merged = pd.concat([df_existing, new_rows], ignore_index=True)
+        # Merge: always keep all old rows, add only truly new rows
+        df_merged = pd.concat([df_existing, new_rows], ignore_index=True)
 
-    # Save back to the original CSV
-    df_merged.to_csv(existing_csv, index=False)
+        # Save back to the original CSV
+        write_losses(df_merged, existing_csv)
+        added, total = len(new_rows), len(df_merged)
 
     # Remove the most recent file since it's no longer needed
     os.remove(recent_csv)
@@ -40,8 +199,8 @@ def merge_with_most_recent(existing_csv, recent_csv="most_recent_losses.csv", lo
     # Logging
     msg = (
         f"Merged into {existing_csv} | "
-        f"Added {len(new_rows)} new rows | "
-        f"Updated total: {len(df_merged)} rows | "
+        f"Added {added} new rows | "
+        f"Updated total: {total} rows | "
         f"Removed {recent_csv}"
     )
     if logger:
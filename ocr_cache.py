@@ -0,0 +1,84 @@
+import sqlite3
+import time
+from datetime import date, datetime
+from date_normalization import DATE_FORMAT, date_window
+
+# Persistent cache of OCR results keyed by image content hash, so identical image bytes
+# (under another URL, or after rebuilding the CSV) never go through EasyOCR twice.
+# Entries are tied to the OCR config version; results of older heuristics are dropped.
+# A version is the base OCR_CONFIG_VERSION plus variant suffixes ("7-gray"): the variants of
+# the current base version are kept side by side, only older bases are pruned.
+# The date window is not part of the version, so moving it (every new year) does not leave
+# a set of stale rows behind. Each row records the window it was found under instead, and is
+# checked against the current window when read: a date outside it and a "no date" found under
+# a narrower window are misses, and the new result replaces the row.
+DEFAULT_OCR_CACHE_PATH = ".ocr_cache.sqlite"
+
+
+def still_valid(cached_date, window_start, window_end) -> bool:
+    """Whether a result found under the window [window_start, window_end] holds for the current window."""
+    start, end = date_window["start"], date_window["end"]
+    if cached_date is None:
+        # Nothing was found in the old window; a wider window could accept a date it rejected
+        return date.fromisoformat(window_start) <= start and end <= date.fromisoformat(window_end)
+    return start <= datetime.strptime(cached_date, DATE_FORMAT).date() <= end
+
+
+class OcrResultCache:
+    """SQLite map from (image sha256, OCR config version) to the extracted date (None = no date)."""
+
+    def __init__(self, path=DEFAULT_OCR_CACHE_PATH, version="1"):
+        self.path = path
+        self.version = str(version)
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(path, timeout=30)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(ocr_results)")}
+        if columns and "window_start" not in columns:
+            # Cache from before the window columns, its rows are all from older versions
+            self.db.execute("DROP TABLE ocr_results")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS ocr_results (
+                sha256 TEXT NOT NULL,
+                version TEXT NOT NULL,
+                date TEXT,
+                window_start TEXT NOT NULL,
+                window_end TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (sha256, version)
+            );
+        """)
+        # Invalidate results produced by other versions of the heuristics, keeping every variant
+        # (grayscale decoding, date window) of this one
+        base = self.version.split("-")[0]
+        self.db.execute(
+            "DELETE FROM ocr_results WHERE version != ? AND version NOT LIKE ?",
+            (base, base + "-%")
+        )
+        self.db.commit()
+
+    def get(self, sha256):
+        """Return (hit, date). date is None when the image was OCR'd without finding a date."""
+        row = self.db.execute(
+            "SELECT date, window_start, window_end FROM ocr_results WHERE sha256 = ? AND version = ?",
+            (sha256, self.version)
+        ).fetchone()
+        if row is None or not still_valid(*row):
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, row[0]
+
+    def put(self, sha256, date):
+        self.db.execute(
+            "INSERT OR REPLACE INTO ocr_results (sha256, version, date, window_start, window_end, created) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (sha256, self.version, date, date_window["start"].isoformat(), date_window["end"].isoformat(), time.time())
+        )
+        self.db.commit()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+
+    def close(self):
+        self.db.close()
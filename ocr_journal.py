@@ -0,0 +1,64 @@
+import json
+import os
+
+# Append-only journal of OCR results for one CSV, keyed by link. Every OCR'd image adds
+# one small line instead of rewriting the whole CSV. The CSV is written once at the end
+# of a run and the journal removed; after an interrupted run the journal is replayed,
+# so the next run resumes where the previous one stopped.
+
+
+def journal_path_for(csv_path):
+    """Journal file kept next to the CSV it belongs to."""
+    return f"{csv_path}.ocr_journal.jsonl"
+
+
+def load_ocr_journal(path):
+    """Return {link: date} from a journal (date None = no date found). Later lines win.
+
+    A last line cut off by a crash is skipped.
+    """
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["link"]] = entry["date"]
+    return entries
+
+
+class OcrJournal:
+    """Appends one JSON line per OCR'd link; fsyncs to disk every `sync_every` entries."""
+
+    def __init__(self, path, sync_every=10):
+        self.path = path
+        self.sync_every = max(1, sync_every)
+        self.unsynced = 0
+        self.file = open(path, "a", encoding="utf-8")
+
+    def append(self, link, date):
+        self.file.write(json.dumps({"link": link, "date": date}) + "\n")
+        # Flushed to the OS right away, so a crash of this process loses nothing
+        self.file.flush()
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        """Make sure appended entries survive a machine crash too."""
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def remove(self):
+        """Delete the journal once its results are in the CSV."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
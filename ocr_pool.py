@@ -0,0 +1,43 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from date_normalization import configure_date_window, date_window
+from worker_limits import cpu_budget, limit_cpu_threads
+
+# Process pool for OCR: every worker loads its own EasyOCR Reader once and gets an
+# equal share of the CPU budget for torch's intra-op threads, so N workers together
+# use about as many threads as one unrestricted process would. Workers are spawned, so
+# they are handed the parent's date window (see date_normalization) explicitly.
+
+# Load each worker's Reader in the pool initializer, so the first batch does not pay for it.
+# Turned off in tests that run the pool with the OCR itself mocked.
+WARM_UP_READER = True
+
+
+def torch_threads_per_worker(workers):
+    return max(1, cpu_budget() // max(1, workers))
+
+
+def init_ocr_worker(torch_threads, window=None, warm_up=True):
+    """Pool initializer: cap torch threads, take over the date window, then load this worker's Reader."""
+    limit_cpu_threads(torch_threads)
+    if window is not None:
+        configure_date_window(*window)
+    if warm_up:
+        from date_extracting_from_image_using_OCR import get_reader
+        get_reader()  # load this worker's Reader once, up front
+
+
+def ocr_image_batch(images):
+    """Run batched OCR + the date heuristics on a list of images inside a worker; (date, tier) per image."""
+    from date_extracting_from_image_using_OCR import extract_dates_and_tiers_from_image_batch
+    return extract_dates_and_tiers_from_image_batch(images)
+
+
+def make_ocr_pool(workers):
+    """Spawn (not fork: torch is not fork-safe once loaded) a pool of OCR workers."""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_ocr_worker,
+        initargs=(torch_threads_per_worker(workers), (date_window["start"], date_window["end"]), WARM_UP_READER)
+    )
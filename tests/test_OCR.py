@@ -1,7 +1,18 @@
 import unittest
 from pathlib import Path
+from unittest import mock
+import numpy as np
 from PIL import Image
-from date_extracting_from_image_using_OCR import extract_date_from_image
+import date_extracting_from_image_using_OCR
+from date_extracting_from_image_using_OCR import (
+    DIGITS_ALLOWLIST,
+    DIGITS_MAX_SIDE,
+    DIGITS_MIN_CONFIDENCE,
+    ROI_MAX_SIDE,
+    extract_date_from_image,
+    extract_dates_and_tiers_from_image_batch,
+    extract_dates_from_image_batch,
+)
 
 
 class TestEasyDates(unittest.TestCase):
@@ -36,5 +47,132 @@ class TestSlashes(unittest.TestCase):
             self.assertEqual(result, expected_date, msg=f"Failed for {filename}")
 
 
+def fake_readtext(texts_for, confidence=0.9):
+    """Fake readtext/readtext_batched: texts_for(image, options) gives the texts of one image."""
+    def as_results(img, options):
+        texts = texts_for(img, options)
+        if options.get("detail") == 1:
+            return [(None, text, confidence) for text in texts]
+        return texts
+
+    single = lambda img, **options: as_results(img, options)
+    batched = lambda imgs, **options: [as_results(img, options) for img in imgs]
+    return single, batched
+
+
+class TestBatchedOcr(unittest.TestCase):
+    """Batching and tier logic, with a fake reader standing in for EasyOCR."""
+
+    def setUp(self):
+        self.reader = mock.Mock()
+        patcher = mock.patch.object(date_extracting_from_image_using_OCR, "get_reader", return_value=self.reader)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_texts(self, texts_for, confidence=0.9):
+        self.reader.readtext.side_effect, self.reader.readtext_batched.side_effect = fake_readtext(texts_for, confidence)
+
+    def calls(self):
+        return self.reader.readtext.call_args_list + self.reader.readtext_batched.call_args_list
+
+    def enable_tier(self, flag):
+        patcher = mock.patch.object(date_extracting_from_image_using_OCR, flag, True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tiers_are_off_by_default(self):
+        self.use_texts(lambda img, options: ["14/06/2022"])
+        results = extract_dates_and_tiers_from_image_batch([Image.new("RGB", (64, 40))])
+        self.assertEqual(results, [("14-06-2022", "full")])
+        # One pass over the whole image, as before the tiers
+        self.assertEqual(len(self.calls()), 1)
+        self.assertEqual(self.reader.readtext.call_args.args[0].shape[:2], (40, 64))
+        self.assertNotIn("allowlist", self.reader.readtext.call_args.kwargs)
+
+    def test_confident_digits_pass_skips_other_tiers(self):
+        self.enable_tier("DIGITS_TIER")
+        self.enable_tier("ROI_TIER")
+        self.use_texts(lambda img, options: ["14/06/2022"])
+        images = [Image.new("RGB", (64, 40)), Image.new("RGB", (64, 40))]
+
+        results = extract_dates_and_tiers_from_image_batch(images)
+
+        self.assertEqual(results, [("14-06-2022", "digits"), ("14-06-2022", "digits")])
+        # Both strips of an image are stacked into one array, and the two images share one detection batch
+        self.assertEqual(len(self.calls()), 1)
+        self.assertEqual([strips.shape[:2] for strips in self.reader.readtext_batched.call_args.args[0]], [(24, 64)] * 2)
+        self.assertEqual(self.reader.readtext_batched.call_args.kwargs["allowlist"], DIGITS_ALLOWLIST)
+
+    def test_pil_modes_and_decoded_arrays(self):
+        self.enable_tier("DIGITS_TIER")
+        self.use_texts(lambda img, options: ["14/06/2022"])
+        images = [
+            Image.new("RGBA", (64, 40)),
+            Image.new("L", (64, 40)),
+            Image.new("P", (64, 40)),
+            np.zeros((40, 64, 3), dtype=np.uint8),  # cv2-decoded BGR
+            np.zeros((40, 64), dtype=np.uint8),     # cv2-decoded grayscale
+        ]
+        results = extract_dates_and_tiers_from_image_batch(images)
+        self.assertEqual(results, [("14-06-2022", "digits")] * 5)
+        strips = [call.args[0] for call in self.reader.readtext.call_args_list]
+        strips += [strip for call in self.reader.readtext_batched.call_args_list for strip in call.args[0]]
+        self.assertEqual(sorted({strip.ndim for strip in strips}), [2, 3])
+
+    def test_low_confidence_escalates_to_roi(self):
+        self.enable_tier("DIGITS_TIER")
+        self.enable_tier("ROI_TIER")
+        self.use_texts(lambda img, options: ["14/06/2022"], confidence=DIGITS_MIN_CONFIDENCE / 2)
+        results = extract_dates_and_tiers_from_image_batch([Image.new("RGB", (64, 40))])
+        self.assertEqual(results, [("14-06-2022", "roi")])
+
+    def test_digits_tier_only_accepts_whole_fragment_dates(self):
+        self.enable_tier("DIGITS_TIER")
+        for texts in (
+            ["2.14/06/2022"],                # date inside a longer digit run
+            ["14/06/2022", "15/06/2022"],    # fragments disagree
+            ["31/11/2022"],                  # not a valid date
+            ["14/06", "2022"],               # split over two fragments
+        ):
+            self.use_texts(lambda img, options: texts if "allowlist" in options else ["14/06/2022"])
+            results = extract_dates_and_tiers_from_image_batch([Image.new("RGB", (64, 40))])
+            self.assertEqual(results, [("14-06-2022", "full")], texts)
+
+    def test_roi_tier_only_accepts_regex_matches(self):
+        self.enable_tier("ROI_TIER")
+        # Only the slash heuristic reads a date in this; that is left to the full image pass
+        self.use_texts(lambda img, options: ["11/0912022"])
+        results = extract_dates_and_tiers_from_image_batch([Image.new("RGB", (64, 40))])
+        self.assertEqual(results, [("11-09-2022", "full")])
+        self.assertEqual(len(self.calls()), 2)
+
+    def test_full_image_fallback(self):
+        self.enable_tier("ROI_TIER")
+        full_height = 40
+        self.use_texts(lambda img, options: (
+            ["24/02/2022"] if img.shape[:2] == (full_height, 48) else ["no date here"]
+        ))
+        images = [Image.new("RGB", (64, full_height)), Image.new("RGB", (48, full_height)), Image.new("RGB", (64, full_height))]
+
+        results = extract_dates_and_tiers_from_image_batch(images)
+
+        # Results come back in input order with the usual heuristics applied
+        self.assertEqual(results, [(None, "none"), ("24-02-2022", "full"), (None, "none")])
+        self.assertEqual(extract_dates_from_image_batch(images), [None, "24-02-2022", None])
+
+    def test_strips_are_downscaled_per_tier(self):
+        self.enable_tier("DIGITS_TIER")
+        self.enable_tier("ROI_TIER")
+        self.use_texts(lambda img, options: ["no date here"])
+        extract_dates_and_tiers_from_image_batch([Image.new("RGB", (3200, 1000))])
+        digits_call, roi_call = self.reader.readtext.call_args_list[:2]
+        self.assertLessEqual(digits_call.args[0].shape[1], DIGITS_MAX_SIDE)
+        self.assertLessEqual(roi_call.args[0].shape[1], ROI_MAX_SIDE)
+        self.assertNotIn("allowlist", roi_call.kwargs)
+
+    def test_empty_batch(self):
+        self.assertEqual(extract_dates_from_image_batch([]), [])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,187 @@
+import unittest
+import filecmp
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+import pandas as pd
+import dataset_store
+from dataset_store import (
+    export_csv,
+    import_csv_if_newer,
+    load_losses,
+    read_losses,
+    read_losses_typed,
+    save_dates,
+    set_dates,
+    store_path_for,
+    write_losses,
+)
+from merge_losses import merge_with_most_recent
+
+CSV_TEXT = """equipment_type,category,loss_type,link_type,link,date,manually_changed
+T-72B,Tanks,destroyed,postimg,https://i.postimg.cc/a.jpg,24-02-2022,False
+T-72B,Tanks,damaged,postimg,https://i.postimg.cc/b.jpg,NO_DATE_FOUND,False
+BMP-2,Infantry Fighting Vehicles,captured,twitter,https://twitter.com/x/status/1,31-11-2022,True
+BMP-2,Infantry Fighting Vehicles,,postimg,https://i.postimg.cc/c.jpg,,False
+"""
+
+
+class TestParquetStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, "losses_with_dates.csv")
+        with open(self.csv_path, "w", encoding="utf-8") as f:
+            f.write(CSV_TEXT)
+        self.store = store_path_for(self.csv_path, "parquet")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_csv_export_is_identical(self):
+        write_losses(pd.read_csv(self.csv_path), self.store)
+        exported = os.path.join(self.tmpdir, "exported.csv")
+        export_csv(self.store, exported)
+        self.assertTrue(filecmp.cmp(self.csv_path, exported, shallow=False))
+        pd.testing.assert_frame_equal(read_losses(self.store), pd.read_csv(self.csv_path))
+
+    def test_typed_schema(self):
+        write_losses(pd.read_csv(self.csv_path), self.store)
+        typed = read_losses_typed(self.store)
+        for column in ("equipment_type", "category", "loss_type", "link_type"):
+            self.assertIsInstance(typed[column].dtype, pd.CategoricalDtype)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(typed["date"]))
+        self.assertEqual(typed["date"].iloc[0], pd.Timestamp(2022, 2, 24))
+        # Non-dates are kept as text, not as a date
+        self.assertEqual(list(typed["date"].isna()), [False, True, True, True])
+        self.assertEqual(typed["manually_changed"].dtype, bool)
+
+    def test_newer_csv_is_imported(self):
+        self.assertTrue(import_csv_if_newer(self.csv_path, self.store))
+        self.assertFalse(import_csv_if_newer(self.csv_path, self.store))
+        export_csv(self.store, self.csv_path)
+        self.assertFalse(import_csv_if_newer(self.csv_path, self.store))
+
+        # A manual edit of the CSV after the store was written is picked up
+        df = pd.read_csv(self.csv_path)
+        df.loc[1, ["date", "manually_changed"]] = ["01-03-2022", True]
+        df.to_csv(self.csv_path, index=False)
+        mtime = os.path.getmtime(self.store) + 10
+        os.utime(self.csv_path, (mtime, mtime))
+        self.assertTrue(import_csv_if_newer(self.csv_path, self.store))
+        self.assertEqual(read_losses(self.store)["date"].iloc[1], "01-03-2022")
+
+    def test_merge_into_parquet_store(self):
+        write_losses(pd.read_csv(self.csv_path), self.store)
+        recent = os.path.join(self.tmpdir, "most_recent_losses.csv")
+        with open(recent, "w", encoding="utf-8") as f:
+            f.write(CSV_TEXT.replace("https://i.postimg.cc/a.jpg", "https://i.postimg.cc/new.jpg"))
+        merge_with_most_recent(self.store, recent)
+        merged = read_losses(self.store)
+        self.assertEqual(len(merged), 5)
+        self.assertEqual(merged["link"].iloc[-1], "https://i.postimg.cc/new.jpg")
+        self.assertFalse(os.path.exists(recent))
+
+
+class TestSqliteStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, "losses_with_dates.csv")
+        with open(self.csv_path, "w", encoding="utf-8") as f:
+            f.write(CSV_TEXT)
+        self.store = store_path_for(self.csv_path, "sqlite")
+        write_losses(pd.read_csv(self.csv_path), self.store)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_csv_export_is_identical(self):
+        exported = os.path.join(self.tmpdir, "exported.csv")
+        export_csv(self.store, exported)
+        self.assertTrue(filecmp.cmp(self.csv_path, exported, shallow=False))
+        pd.testing.assert_frame_equal(read_losses(self.store), pd.read_csv(self.csv_path))
+
+    def test_indexes(self):
+        db = sqlite3.connect(self.store)
+        indexes = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        db.close()
+        self.assertTrue({"losses_link", "losses_date", "losses_category"} <= indexes)
+
+    def test_merge_inserts_only_new_links(self):
+        recent = os.path.join(self.tmpdir, "most_recent_losses.csv")
+        with open(recent, "w", encoding="utf-8") as f:
+            f.write(CSV_TEXT.replace("https://i.postimg.cc/a.jpg", "https://i.postimg.cc/new.jpg"))
+        with mock.patch.object(dataset_store, "write_sqlite") as rewrite:
+            merge_with_most_recent(self.store, recent)
+        rewrite.assert_not_called()
+        merged = read_losses(self.store)
+        self.assertEqual(list(merged.index), [0, 1, 2, 3, 4])
+        self.assertEqual(merged.loc[4, "link"], "https://i.postimg.cc/new.jpg")
+        self.assertEqual(merged.loc[0, "link"], "https://i.postimg.cc/a.jpg")
+
+    def test_save_dates_updates_changed_rows_in_place(self):
+        df = read_losses(self.store)
+        before = df["date"].copy()
+        df.loc[3, "date"] = "02-03-2022"
+        with mock.patch.object(dataset_store, "update_dates", wraps=dataset_store.update_dates) as update:
+            save_dates(df, self.store, before=before)
+        self.assertEqual(list(update.call_args.args[1].index), [3])
+        self.assertEqual(list(read_losses(self.store)["date"]), list(df["date"]))
+
+
+class TestLoadLosses(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, "losses_with_dates.csv")
+        with open(self.csv_path, "w", encoding="utf-8") as f:
+            f.write(CSV_TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_dtypes_and_date_states(self):
+        for store_format in dataset_store.STORE_FORMATS:
+            path = store_path_for(self.csv_path, store_format)
+            if store_format != "csv":
+                write_losses(pd.read_csv(self.csv_path), path)
+            df = load_losses(path)
+            for column in ("equipment_type", "category", "loss_type", "link_type"):
+                self.assertIsInstance(df[column].dtype, pd.CategoricalDtype, store_format)
+            self.assertEqual(df["manually_changed"].dtype, bool)
+            self.assertEqual(list(df["date_state"]), ["found", "no_date_found", "manual", "missing"], store_format)
+
+    def test_set_dates_keeps_states_and_saves_csv_layout(self):
+        df = load_losses(self.csv_path)
+        before = df["date"].copy()
+        set_dates(df, [1, 3], ["05-03-2022", "NO_DATE_FOUND"])
+        self.assertEqual(list(df["date_state"]), ["found", "found", "manual", "no_date_found"])
+
+        save_dates(df, self.csv_path, before=before)
+        saved = pd.read_csv(self.csv_path)
+        self.assertEqual(list(saved.columns), dataset_store.COLUMNS)
+        self.assertEqual(list(saved["date"])[1::2], ["05-03-2022", "NO_DATE_FOUND"])
+
+    def test_save_dates_skips_unchanged_stores(self):
+        for store_format in dataset_store.STORE_FORMATS:
+            path = store_path_for(self.csv_path, store_format)
+            if store_format != "csv":
+                write_losses(pd.read_csv(self.csv_path), path)
+            df = load_losses(path)
+            with mock.patch.object(dataset_store, "write_losses") as write, \
+                 mock.patch.object(dataset_store, "update_dates") as update:
+                save_dates(df, path, before=df["date"].copy())
+            write.assert_not_called()
+            update.assert_not_called()
+
+    def test_unchanged_frame_writes_identical_csv(self):
+        exported = os.path.join(self.tmpdir, "exported.csv")
+        write_losses(load_losses(self.csv_path), exported)
+        self.assertTrue(filecmp.cmp(self.csv_path, exported, shallow=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
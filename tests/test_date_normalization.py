@@ -0,0 +1,58 @@
+import unittest
+from datetime import date
+import pandas as pd
+from date_normalization import (
+    DEFAULT_DATE_WINDOW,
+    configure_date_window,
+    invalid_date_reasons,
+    normalize_date,
+    normalize_dates,
+    parse_dates,
+)
+from date_extracting_from_image_using_OCR import date_from_ocr_texts
+from extract_from_links_with_dates import extract_dates_from_postimg_link_strings
+
+
+class TestDateNormalization(unittest.TestCase):
+
+    def tearDown(self):
+        configure_date_window(*DEFAULT_DATE_WINDOW)
+
+    def test_scalar_and_vectorized_agree(self):
+        parts = [(5, 8, 23), (5, 8, 2023), (31, 11, 2022), (29, 2, 2023), (29, 2, 2024), (18, 13, 2023), (5, 8, 2019)]
+        expected = ["05-08-2023", "05-08-2023", None, None, "29-02-2024", None, None]
+        self.assertEqual([normalize_date(*p) for p in parts], expected)
+        self.assertEqual(list(normalize_dates(*zip(*parts))), expected)
+
+    def test_invalid_date_reasons(self):
+        next_year = DEFAULT_DATE_WINDOW[1].year + 1
+        dates = pd.Series(["05-08-2023", "1-3-2022", "31-11-2022", "18-13-2023", f"05-08-{next_year}", " 24-02-2022"])
+        self.assertEqual(list(invalid_date_reasons(dates)), [
+            None, "Invalid format", "Invalid day: 31", "Invalid month: 13", f"Invalid year: {next_year}", None,
+        ])
+        parsed = parse_dates(dates)
+        self.assertEqual(list(parsed.isna()), [False, True, True, True, True, False])
+        self.assertEqual(parsed.iloc[5], pd.Timestamp(2022, 2, 24))
+
+    def test_default_window_ends_with_the_current_year(self):
+        self.assertEqual(DEFAULT_DATE_WINDOW[1], date(date.today().year, 12, 31))
+        self.assertEqual(normalize_date(31, 12, date.today().year), f"31-12-{date.today().year}")
+
+    def test_window_applies_everywhere(self):
+        configure_date_window(date(2022, 2, 24), date(2024, 12, 31))
+        self.assertIsNone(normalize_date(10, 1, 2022))
+        self.assertEqual(invalid_date_reasons(pd.Series(["10-01-2022"])).iloc[0],
+                         "Outside date window 24-02-2022 to 31-12-2024")
+        self.assertIsNone(date_from_ocr_texts(["05/08/2025"]))
+        links = pd.Series(["https://i.postimg.cc/x/a-05-08-25.jpg", "https://i.postimg.cc/x/a-05-08-24.jpg"])
+        self.assertEqual(list(extract_dates_from_postimg_link_strings(links)), [None, "05-08-2024"])
+
+    def test_ocr_texts(self):
+        self.assertEqual(date_from_ocr_texts(["2023-08-05"]), "05-08-2023")
+        # An impossible first match does not stop the search
+        self.assertEqual(date_from_ocr_texts(["13/13/2023", "05.08.23"]), "05-08-2023")
+        self.assertEqual(date_from_ocr_texts(["11/0912022"]), "11-09-2022")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from download_html import download_html, mark_snapshot_processed, meta_path_for, snapshot_processed
+
+
+class OryxStandIn(BaseHTTPRequestHandler):
+    """Tiny local stand-in for the Oryx page, honouring ETag / If-Modified-Since and gzip."""
+
+    body = b"<h3>Tanks (1)</h3><ul><li>1 T-62: <a href='x'>(1, destroyed)</a></li></ul>"
+    etag = '"v1"'
+    last_modified = "Sat, 18 Oct 2025 00:00:00 GMT"
+    send_validators = True
+    requests_seen = []
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests_seen.append(dict(self.headers))
+
+        # If-None-Match takes precedence over If-Modified-Since
+        if "If-None-Match" in self.headers:
+            not_modified = self.headers["If-None-Match"] == cls.etag
+        else:
+            not_modified = self.headers.get("If-Modified-Since") == cls.last_modified
+        if cls.send_validators and not_modified:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        payload = cls.body
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            payload = gzip.compress(payload)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        if cls.send_validators:
+            self.send_header("ETag", cls.etag)
+            self.send_header("Last-Modified", cls.last_modified)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestConditionalDownload(unittest.TestCase):
+
+    def setUp(self):
+        OryxStandIn.body = b"<h3>Tanks (1)</h3><ul><li>1 T-62: <a href='x'>(1, destroyed)</a></li></ul>"
+        OryxStandIn.etag = '"v1"'
+        OryxStandIn.send_validators = True
+        OryxStandIn.requests_seen = []
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), OryxStandIn)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/oryx.html"
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.html = os.path.join(self.tmpdir, "losses.html")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def read_html(self):
+        with open(self.html, "rb") as f:
+            return f.read()
+
+    def test_first_download_writes_decoded_snapshot(self):
+        self.assertTrue(download_html(self.url, self.html))
+        self.assertEqual(self.read_html(), OryxStandIn.body)
+        self.assertIn("gzip", OryxStandIn.requests_seen[0]["Accept-Encoding"])
+        self.assertTrue(os.path.exists(meta_path_for(self.html)))
+
+    def test_unchanged_page_returns_304(self):
+        download_html(self.url, self.html)
+        mtime = os.path.getmtime(self.html)
+
+        self.assertFalse(download_html(self.url, self.html))
+        self.assertEqual(OryxStandIn.requests_seen[1]["If-None-Match"], '"v1"')
+        self.assertEqual(os.path.getmtime(self.html), mtime)
+
+    def test_unchanged_content_without_validators_is_detected_by_hash(self):
+        OryxStandIn.send_validators = False
+        download_html(self.url, self.html)
+        mtime = os.path.getmtime(self.html)
+
+        self.assertFalse(download_html(self.url, self.html))
+        self.assertNotIn("If-None-Match", OryxStandIn.requests_seen[1])
+        self.assertEqual(os.path.getmtime(self.html), mtime)
+
+    def test_changed_page_is_downloaded(self):
+        download_html(self.url, self.html)
+        OryxStandIn.body = OryxStandIn.body.replace(b"T-62", b"T-64")
+        OryxStandIn.etag = '"v2"'
+
+        self.assertTrue(download_html(self.url, self.html))
+        self.assertEqual(self.read_html(), OryxStandIn.body)
+
+    def test_missing_snapshot_ignores_stale_meta(self):
+        download_html(self.url, self.html)
+        os.remove(self.html)
+
+        self.assertTrue(download_html(self.url, self.html))
+        self.assertNotIn("If-None-Match", OryxStandIn.requests_seen[1])
+        self.assertEqual(self.read_html(), OryxStandIn.body)
+
+    def test_unchanged_snapshot_is_processed_until_a_run_completes(self):
+        download_html(self.url, self.html)
+        self.assertFalse(snapshot_processed(self.html))
+
+        # An interrupted run never marks the snapshot, so the next run does not skip it
+        self.assertFalse(download_html(self.url, self.html))
+        self.assertFalse(snapshot_processed(self.html))
+
+        mark_snapshot_processed(self.html)
+        self.assertFalse(download_html(self.url, self.html))
+        self.assertTrue(snapshot_processed(self.html))
+
+        OryxStandIn.body = OryxStandIn.body.replace(b"T-62", b"T-64")
+        OryxStandIn.etag = '"v2"'
+        self.assertTrue(download_html(self.url, self.html))
+        self.assertFalse(snapshot_processed(self.html))
+
+
+if __name__ == "__main__":
+    unittest.main()
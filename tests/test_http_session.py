@@ -0,0 +1,111 @@
+import unittest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+import http_session
+import worker_limits
+from http_session import LATENCY, fetch
+
+
+class FlakyImageHost(BaseHTTPRequestHandler):
+    """Local stand-in for postimg that fails a configurable number of times first."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    failures_left = 0
+    retry_after = None
+    client_ports = []
+
+    def do_GET(self):
+        cls = type(self)
+        cls.client_ports.append(self.client_address[1])
+        if cls.failures_left > 0:
+            cls.failures_left -= 1
+            status, body = 503, b"busy"
+        else:
+            status, body = 200, b"\x89PNG fake image"
+        self.send_response(status)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503 and cls.retry_after is not None:
+            self.send_header("Retry-After", cls.retry_after)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPooledSession(unittest.TestCase):
+
+    def setUp(self):
+        FlakyImageHost.failures_left = 0
+        FlakyImageHost.retry_after = None
+        FlakyImageHost.client_ports = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyImageHost)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/img.png"
+        http_session.session = None  # fresh pool per test
+        LATENCY.reset()
+
+    def tearDown(self):
+        http_session.get_session().close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_transient_errors_are_retried(self):
+        FlakyImageHost.failures_left = 2
+        response = fetch(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(FlakyImageHost.client_ports), 3)
+
+    def test_persistent_errors_return_last_response(self):
+        FlakyImageHost.failures_left = 10
+        response = fetch(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(LATENCY.failures, 1)
+
+    def test_connection_is_kept_alive(self):
+        for _ in range(3):
+            self.assertEqual(fetch(self.url).status_code, 200)
+        self.assertEqual(len(set(FlakyImageHost.client_ports)), 1)
+
+    def test_latency_is_recorded(self):
+        fetch(self.url)
+        fetch(self.url)
+        self.assertEqual(LATENCY.count, 2)
+        self.assertGreater(LATENCY.total, 0)
+        self.assertIn("2 requests (0 failed)", LATENCY.summary())
+
+    def test_threads_share_one_session(self):
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(http_session.get_session()))
+        thread.start()
+        thread.join()
+        self.assertIs(sessions[0], http_session.get_session())
+
+    def test_budget_slot_is_released_during_backoff(self):
+        FlakyImageHost.failures_left = 1
+        slots = threading.Semaphore(1)
+        free_during_backoff = []
+
+        def sleep(retry, response=None):
+            # Another request could take the only slot now
+            free_during_backoff.append(slots.acquire(blocking=False))
+            slots.release()
+
+        with mock.patch.object(worker_limits, "HTTP_SLOTS", slots), \
+             mock.patch.object(http_session.Retry, "sleep", sleep):
+            self.assertEqual(fetch(self.url).status_code, 200)
+        self.assertEqual(free_during_backoff, [True])
+        self.assertTrue(slots.acquire(blocking=False))  # and it was handed back afterwards
+
+    def test_retry_after_is_capped(self):
+        FlakyImageHost.failures_left = 1
+        FlakyImageHost.retry_after = "3600"
+        with mock.patch("urllib3.util.retry.time.sleep") as sleep:
+            self.assertEqual(fetch(self.url).status_code, 200)
+        sleep.assert_called_once_with(http_session.MAX_RETRY_SLEEP)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+from PIL import Image
+import extract_images_from_postimg
+from image_cache import ImageCache, configure_image_cache
+
+
+def png_bytes(color):
+    buffer = BytesIO()
+    Image.new("RGB", (4, 4), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def encoded(img, format="PNG"):
+    buffer = BytesIO()
+    img.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+class TestImageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = ImageCache(os.path.join(self.tmpdir, "cache"), max_bytes=250)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_roundtrip(self):
+        self.assertIsNone(self.cache.get("https://i.postimg.cc/a.jpg"))
+        self.cache.put("https://i.postimg.cc/a.jpg", b"a" * 10)
+        self.assertEqual(self.cache.get("https://i.postimg.cc/a.jpg"), b"a" * 10)
+
+    def test_same_content_is_stored_once(self):
+        sha_1 = self.cache.put("https://postimg.cc/page", b"x" * 100)
+        sha_2 = self.cache.put("https://i.postimg.cc/x.jpg", b"x" * 100)
+        self.assertEqual(sha_1, sha_2)
+        self.assertEqual(self.cache.total_bytes(), 100)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.put("a", b"a" * 100)
+        self.cache.put("b", b"b" * 100)
+        self.cache.get("a")  # a is now more recent than b
+        self.cache.put("c", b"c" * 100)
+
+        self.assertLessEqual(self.cache.total_bytes(), 250)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), b"a" * 100)
+        self.assertEqual(self.cache.get("c"), b"c" * 100)
+
+    def test_missing_blob_is_a_miss(self):
+        sha256 = self.cache.put("a", b"a" * 10)
+        os.remove(self.cache.blob_path(sha256))
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.total_bytes(), 0)
+
+
+class TestLoadPostimgImageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        configure_image_cache(cache_dir=os.path.join(self.tmpdir, "cache"))
+
+    def tearDown(self):
+        configure_image_cache()
+        shutil.rmtree(self.tmpdir)
+
+    def test_second_load_reads_from_disk(self):
+        content = png_bytes("red")
+        with mock.patch.object(extract_images_from_postimg, "download_image_bytes", return_value=content) as download:
+            first = extract_images_from_postimg.load_postimg_image("https://i.postimg.cc/red.png")
+            second = extract_images_from_postimg.load_postimg_image("https://i.postimg.cc/red.png")
+        self.assertEqual(download.call_count, 1)
+        self.assertEqual(first.size, (4, 4))
+        self.assertEqual(second.size, (4, 4))
+
+    def test_failed_download_is_not_cached(self):
+        with mock.patch.object(extract_images_from_postimg, "download_image_bytes", return_value=None) as download:
+            self.assertIsNone(extract_images_from_postimg.load_postimg_image("https://i.postimg.cc/gone.png"))
+            self.assertIsNone(extract_images_from_postimg.load_postimg_image("https://i.postimg.cc/gone.png"))
+        self.assertEqual(download.call_count, 2)
+
+    def test_cache_can_be_disabled(self):
+        configure_image_cache(enabled=False)
+        content = png_bytes("blue")
+        with mock.patch.object(extract_images_from_postimg, "download_image_bytes", return_value=content) as download:
+            extract_images_from_postimg.load_postimg_image("https://i.postimg.cc/blue.png")
+            extract_images_from_postimg.load_postimg_image("https://i.postimg.cc/blue.png")
+        self.assertEqual(download.call_count, 2)
+
+
+class TestDecodeImage(unittest.TestCase):
+
+    def test_modes_decode_to_bgr(self):
+        red = (255, 0, 0)
+        images = {
+            "RGB": Image.new("RGB", (6, 4), red),
+            "RGBA": Image.new("RGBA", (6, 4), red + (128,)),
+            "P": Image.new("RGB", (6, 4), red).convert("P"),
+        }
+        for mode, img in images.items():
+            for format in ("PNG", "GIF") if mode == "P" else ("PNG",):
+                with self.subTest(mode=mode, format=format):
+                    array = extract_images_from_postimg.decode_image(encoded(img, format))
+                    self.assertEqual(array.shape, (4, 6, 3))
+                    self.assertEqual(tuple(array[0, 0]), (0, 0, 255))
+
+    def test_grayscale_input_and_output(self):
+        content = encoded(Image.new("L", (6, 4), 200))
+        self.assertEqual(extract_images_from_postimg.decode_image(content).shape, (4, 6, 3))
+        gray = extract_images_from_postimg.decode_image(content, grayscale=True)
+        self.assertEqual(gray.shape, (4, 6))
+        self.assertEqual(gray[0, 0], 200)
+
+    def test_large_image_is_decoded_reduced(self):
+        content = encoded(Image.new("RGB", (64, 32), "white"))
+        with mock.patch.object(extract_images_from_postimg, "MAX_DECODE_PIXELS", 600):
+            self.assertEqual(extract_images_from_postimg.decode_image(content).shape, (16, 32, 3))
+
+    def test_undecodable_bytes(self):
+        self.assertIsNone(extract_images_from_postimg.decode_image(b"<html>not an image</html>"))
+
+    def test_load_array_with_hash(self):
+        configure_image_cache(enabled=False)
+        content = png_bytes("red")
+        try:
+            with mock.patch.object(extract_images_from_postimg, "download_image_bytes", return_value=content):
+                content_hash, array = extract_images_from_postimg.load_postimg_array_with_hash("https://i.postimg.cc/red.png")
+        finally:
+            configure_image_cache()
+        self.assertEqual(content_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(array.shape, (4, 4, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
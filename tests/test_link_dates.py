@@ -0,0 +1,51 @@
+import unittest
+import pandas as pd
+from extract_from_links_with_dates import (
+    extract_date_from_postimg_with_date_in_link_string,
+    extract_dates_from_postimg_link_strings,
+)
+
+BASE = "https://i.postimg.cc/jdFBJdQb/"
+
+
+class TestLinkDates(unittest.TestCase):
+
+    def parse(self, filenames):
+        links = pd.Series([BASE + name for name in filenames], index=range(10, 10 + len(filenames)))
+        dates = extract_dates_from_postimg_link_strings(links)
+        self.assertEqual(list(dates.index), list(links.index))
+        return list(dates)
+
+    def test_layouts(self):
+        self.assertEqual(self.parse([
+            "1027-t55-dam-05-08-23.jpg",
+            "1027-t55-dam-05-08-2023.jpg",
+            "2022-09-14-t72.jpg",
+            "1018-ural4320-and-btr80-18-07-23-destr.jpg",
+            "t72b3-no-date.jpg",
+        ]), ["05-08-2023", "05-08-2023", "14-09-2022", "18-07-2023", None])
+
+    def test_impossible_dates_are_rejected(self):
+        self.assertEqual(self.parse([
+            "1020-tor-m2-dam-18-13-23.jpg",
+            "1062-bmp-destr-24-26-23.jpg",
+            "1031-bmp2-destr-31-11-22.jpg",
+            "1000-t72-29-02-23.jpg",
+            "1000-t72-29-02-24.jpg",
+            "1000-t72-05-08-21.jpg",
+        ]), [None, None, None, None, "29-02-2024", None])
+
+    def test_last_date_of_the_filename(self):
+        self.assertEqual(self.parse([
+            "1015-T-72-B3-Obr-2016-26-10-23.jpg",
+            "1031-t80bv-2022-01-07-23.jpg",
+            "2022-09-14-307095797-3212297189018838-4688457807291624709-n.jpg",
+        ]), ["26-10-2023", "01-07-2023", "14-09-2022"])
+
+    def test_single_link(self):
+        self.assertEqual(extract_date_from_postimg_with_date_in_link_string(BASE + "a-05-08-23.jpg"), "05-08-2023")
+        self.assertIsNone(extract_date_from_postimg_with_date_in_link_string(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+import pandas as pd
+import dataset_store
+from dataset_store import link_counts, link_index_path_for, load_link_index, save_dates
+from merge_losses import merge_changes, merge_with_most_recent, missing_rows
+
+COLUMNS = ["equipment_type", "category", "loss_type", "link_type", "link", "date", "manually_changed"]
+
+
+def losses(rows):
+    """DataFrame from (equipment_type, category, loss_type, link, date, manually_changed) tuples."""
+    return pd.DataFrame(
+        [(equipment, category, loss, "postimg", link, date, manual)
+         for equipment, category, loss, link, date, manual in rows],
+        columns=COLUMNS
+    )
+
+
+def scraped(rows):
+    """A fresh scrape: same rows without dates."""
+    return losses([(equipment, category, loss, link, None, False) for equipment, category, loss, link in rows])
+
+
+EXISTING = losses([
+    ("T-72B", "Tanks", "destroyed", "a.jpg", "24-02-2022", False),
+    ("Ural-4320", "Trucks, Vehicles, Jeeps, andTrains", "destroyed", "b.jpg", "01-03-2022", False),
+    ("KamAZ 6x6", "Trucks, Vehicles, Jeeps, andTrains", "destroyed", "c.jpg", "02-03-2022", True),
+    ("KamAZ 6x6", "Trucks, Vehicles, Jeeps, andTrains", "destroyed", "c.jpg", "02-03-2022", True),
+    ("BMP-2", "Infantry Fighting Vehicles", "captured", "d.jpg", "NO_DATE_FOUND", False),
+])
+
+
+class TestMergeChanges(unittest.TestCase):
+
+    def test_unchanged_scrape_keeps_everything(self):
+        new = scraped(EXISTING[["equipment_type", "category", "loss_type", "link"]].itertuples(index=False))
+        merged, stats = merge_changes(EXISTING, new)
+        pd.testing.assert_frame_equal(merged, EXISTING, check_dtype=False)
+        self.assertEqual(stats["changed_links"], 0)
+
+    def test_edited_rows_are_applied_in_place_with_dates_carried_over(self):
+        new = scraped([
+            ("T-72B", "Tanks", "destroyed", "a.jpg"),
+            ("Ural-4320", "Trucks, Vehicles, Jeeps, and Trains", "destroyed", "b.jpg"),
+            ("KamAZ 6x6", "Trucks, Vehicles, Jeeps, and Trains", "destroyed", "c.jpg"),
+            ("KamAZ 6x6", "Trucks, Vehicles, Jeeps, and Trains", "destroyed", "c.jpg"),
+            ("BMP-2", "Infantry Fighting Vehicles", "captured", "d.jpg"),
+        ])
+        merged, stats = merge_changes(EXISTING, new)
+        self.assertEqual(stats["changed_links"], 2)
+        self.assertEqual(list(merged["category"])[1:4], ["Trucks, Vehicles, Jeeps, and Trains"] * 3)
+        self.assertEqual(list(merged["date"]), list(EXISTING["date"]))
+        self.assertEqual(list(merged["manually_changed"]), list(EXISTING["manually_changed"]))
+
+    def test_multiplicity_change_on_a_link(self):
+        new = scraped([
+            ("T-72B", "Tanks", "destroyed", "a.jpg"),
+            ("T-72B", "Tanks", "destroyed", "a.jpg"),  # second hull on the same image
+            ("Ural-4320", "Trucks, Vehicles, Jeeps, andTrains", "destroyed", "b.jpg"),
+            ("KamAZ 6x6", "Trucks, Vehicles, Jeeps, andTrains", "destroyed", "c.jpg"),  # one hull less
+            ("BMP-2", "Infantry Fighting Vehicles", "captured", "d.jpg"),
+            ("BMP-1", "Infantry Fighting Vehicles", "destroyed", "e.jpg"),  # new link
+        ])
+        merged, stats = merge_changes(EXISTING, new)
+        self.assertEqual(list(merged["link"]), ["a.jpg", "a.jpg", "b.jpg", "c.jpg", "d.jpg", "e.jpg"])
+        self.assertEqual(list(merged["date"])[:5],
+                         ["24-02-2022", "24-02-2022", "01-03-2022", "02-03-2022", "NO_DATE_FOUND"])
+        self.assertTrue(pd.isna(merged["date"].iloc[5]))
+        self.assertEqual(stats["added_rows"], 1)
+
+    def test_manual_flags_of_new_and_unflagged_rows(self):
+        existing = EXISTING.copy()
+        existing["manually_changed"] = existing["manually_changed"].astype(object)
+        existing.loc[1, "manually_changed"] = None
+        new = scraped([
+            ("T-72B", "Tanks", "destroyed", "a.jpg"),
+            ("Ural-4320", "Trucks, Vehicles, Jeeps, and Trains", "destroyed", "b.jpg"),  # edited, flag missing
+            ("KamAZ 6x6", "Trucks, Vehicles, Jeeps, andTrains", "destroyed", "c.jpg"),
+            ("KamAZ 6x6", "Trucks, Vehicles, Jeeps, andTrains", "destroyed", "c.jpg"),
+            ("KamAZ 6x6", "Trucks, Vehicles, Jeeps, andTrains", "destroyed", "c.jpg"),  # new row, manual link
+            ("BMP-2", "Infantry Fighting Vehicles", "captured", "d.jpg"),
+        ])
+        merged, _ = merge_changes(existing, new)
+        self.assertEqual(list(merged["manually_changed"]), [False, False, True, True, False, False])
+        self.assertEqual(merged.loc[4, "date"], "02-03-2022")
+
+    def test_removed_links_are_kept_unless_dropped(self):
+        new = scraped([("T-72B", "Tanks", "destroyed", "a.jpg")])
+        kept, stats = merge_changes(EXISTING, new)
+        self.assertEqual(len(kept), len(EXISTING))
+        self.assertEqual(stats["removed_links"], 3)
+        dropped, _ = merge_changes(EXISTING, new, drop_removed=True)
+        self.assertEqual(list(dropped["link"]), ["a.jpg"])
+
+    def test_merge_with_most_recent_changes_mode(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            existing_csv = os.path.join(tmpdir, "losses_with_dates.csv")
+            recent_csv = os.path.join(tmpdir, "most_recent_losses.csv")
+            EXISTING.to_csv(existing_csv, index=False)
+            new = EXISTING.copy()
+            new["category"] = new["category"].str.replace("andTrains", "and Trains")
+            new["date"] = None
+            new.to_csv(recent_csv, index=False)
+
+            merge_with_most_recent(existing_csv, recent_csv, mode="links")
+            self.assertIn("andTrains", pd.read_csv(existing_csv)["category"].iloc[1])
+
+            new.to_csv(recent_csv, index=False)
+            merge_with_most_recent(existing_csv, recent_csv, mode="changes")
+            merged = pd.read_csv(existing_csv)
+            self.assertEqual(merged["category"].iloc[1], "Trucks, Vehicles, Jeeps, and Trains")
+            self.assertEqual(list(merged["date"]), list(EXISTING["date"]))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestAppendMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.existing_csv = os.path.join(self.tmpdir, "losses_with_dates.csv")
+        self.recent_csv = os.path.join(self.tmpdir, "most_recent_losses.csv")
+        EXISTING.to_csv(self.existing_csv, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def scrape(self, rows):
+        scraped(rows).to_csv(self.recent_csv, index=False)
+
+    def test_missing_rows_per_link(self):
+        new = scraped([
+            ("T-72B", "Tanks", "destroyed", "a.jpg"),
+            ("T-72B", "Tanks", "destroyed", "a.jpg"),
+            ("KamAZ 6x6", "Trucks, Vehicles, Jeeps, andTrains", "destroyed", "c.jpg"),
+            ("BMP-1", "Infantry Fighting Vehicles", "destroyed", "e.jpg"),
+        ])
+        rows = missing_rows(new, {"a.jpg": 1, "c.jpg": 2})
+        self.assertEqual(list(rows.index), [1, 3])
+
+    def test_second_hull_is_appended_without_rewriting(self):
+        with open(self.existing_csv, "rb") as f:
+            before = f.read()
+        self.scrape([
+            ("T-72B", "Tanks", "destroyed", "a.jpg"),
+            ("T-72B", "Tanks", "destroyed", "a.jpg"),  # second hull on an existing link
+            ("BMP-1", "Infantry Fighting Vehicles", "destroyed", "e.jpg"),
+        ])
+        merge_with_most_recent(self.existing_csv, self.recent_csv)
+
+        with open(self.existing_csv, "rb") as f:
+            after = f.read()
+        self.assertTrue(after.startswith(before))
+        merged = pd.read_csv(self.existing_csv)
+        self.assertEqual(list(merged["link"])[len(EXISTING):], ["a.jpg", "e.jpg"])
+        self.assertEqual(load_link_index(self.existing_csv)["a.jpg"], 2)
+
+        # Scraping the same again adds nothing and does not parse the dataset
+        self.scrape([("T-72B", "Tanks", "destroyed", "a.jpg")] * 2)
+        with mock.patch.object(dataset_store.pd, "read_csv", wraps=pd.read_csv) as read_csv:
+            merge_with_most_recent(self.existing_csv, self.recent_csv)
+        self.assertEqual(len(pd.read_csv(self.existing_csv)), len(EXISTING) + 2)
+        reads_of_dataset = [call for call in read_csv.call_args_list if call.args[0] == self.existing_csv]
+        self.assertTrue(all(call.kwargs.get("nrows") == 0 for call in reads_of_dataset))
+
+    def test_stale_index_is_rebuilt(self):
+        link_counts(self.existing_csv)
+        # Edited by something else: one row removed
+        EXISTING.iloc[:-1].to_csv(self.existing_csv, index=False)
+        self.assertIsNone(load_link_index(self.existing_csv))
+        self.assertNotIn("d.jpg", link_counts(self.existing_csv))
+
+    def test_date_updates_keep_the_index_current(self):
+        link_counts(self.existing_csv)
+        df = pd.read_csv(self.existing_csv)
+        before = df["date"].copy()
+        df.loc[4, "date"] = "05-03-2022"
+        save_dates(df, self.existing_csv, before=before)
+        self.assertIsNotNone(load_link_index(self.existing_csv))
+        self.assertTrue(os.path.exists(link_index_path_for(self.existing_csv)))
+
+
+if __name__ == "__main__":
+    unittest.main()
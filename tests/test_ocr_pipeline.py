@@ -0,0 +1,302 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date
+from unittest import mock
+import pandas as pd
+import extract_dates_from_images
+import ocr_pool
+from date_normalization import DEFAULT_DATE_WINDOW, configure_date_window
+from extract_dates_from_images import load_images_from_csv, extract_dates_from_images as run_ocr
+from ocr_cache import OcrResultCache
+from ocr_journal import OcrJournal, journal_path_for, load_ocr_journal
+from ocr_pool import torch_threads_per_worker
+
+
+def fake_load(url):
+    """Stand-in for load_postimg_array_with_hash: the 'image' and its hash are the url."""
+    return f"sha-{url}", url
+
+
+def ocr_in_worker(images):
+    """Stand-in for ocr_pool.ocr_image_batch; returns the worker pid so the test can see where it ran."""
+    return [(str(os.getpid()), "full")] * len(images)
+
+
+def fake_batch_ocr(date):
+    """Stand-in for extract_dates_and_tiers_from_image_batch returning the same date for every image."""
+    return mock.Mock(side_effect=lambda images: [(date, "roi")] * len(images))
+
+
+def make_df(n):
+    return pd.DataFrame({
+        "equipment_type": ["T-72"] * n,
+        "category": ["Tanks"] * n,
+        "loss_type": ["destroyed"] * n,
+        "link_type": ["postimg"] * n,
+        "link": [f"https://i.postimg.cc/{i}.jpg" for i in range(n)],
+        "date": [""] * n,
+        "manually_changed": [False] * n,
+    })
+
+
+class TestPrefetchPipeline(unittest.TestCase):
+
+    def test_rows_are_yielded_in_order(self):
+        df = make_df(20)
+        with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=fake_load):
+            results = list(load_images_from_csv(df, download_threads=4, prefetch_depth=3))
+        self.assertEqual([indices for indices, _, _, _ in results], [[i] for i in range(20)])
+        self.assertTrue(all(url == img for _, url, _, img in results))
+
+    def test_prefetch_depth_bounds_downloads_ahead(self):
+        df = make_df(30)
+        started = []
+        lock = threading.Lock()
+
+        def fake_download(url):
+            with lock:
+                started.append(url)
+            return fake_load(url)
+
+        consumed = 0
+        max_ahead = 0
+        with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=fake_download):
+            for _ in load_images_from_csv(df, download_threads=4, prefetch_depth=5):
+                consumed += 1
+                time.sleep(0.005)  # slow consumer, like OCR
+                with lock:
+                    max_ahead = max(max_ahead, len(started) - consumed)
+        self.assertEqual(consumed, 30)
+        self.assertLessEqual(max_ahead, 5)
+
+    def test_sequential_fallback(self):
+        df = make_df(3)
+        with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=fake_load):
+            results = list(load_images_from_csv(df, download_threads=0))
+        self.assertEqual(len(results), 3)
+
+    def test_rows_sharing_a_link_are_fetched_once(self):
+        df = make_df(5)
+        df.loc[[1, 3], "link"] = df.loc[0, "link"]
+        with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=fake_load) as load:
+            results = list(load_images_from_csv(df, download_threads=2, prefetch_depth=2))
+        self.assertEqual(load.call_count, 3)
+        self.assertEqual([indices for indices, _, _, _ in results], [[0, 1, 3], [2], [4]])
+
+    def test_shared_link_result_is_fanned_out(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            df = make_df(6)
+            df.loc[[2, 4], "link"] = df.loc[1, "link"]
+            with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=fake_load), \
+                 mock.patch.object(extract_dates_from_images, "extract_dates_and_tiers_from_image_batch", fake_batch_ocr("05-05-2023")) as ocr:
+                df = run_ocr(df, csv_path=os.path.join(tmpdir, "losses.csv"), ocr_cache_path=None)
+            self.assertEqual(ocr.call_count, 4)
+            self.assertTrue((df["date"] == "05-05-2023").all())
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_images_are_ocrd_in_batches(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            ocr = fake_batch_ocr("01-03-2022")
+            with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=fake_load), \
+                 mock.patch.object(extract_dates_from_images, "extract_dates_and_tiers_from_image_batch", ocr):
+                df = run_ocr(make_df(10), csv_path=os.path.join(tmpdir, "losses.csv"),
+                             ocr_cache_path=None, ocr_batch_size=4)
+            self.assertEqual([len(call.args[0]) for call in ocr.call_args_list], [4, 4, 2])
+            self.assertTrue((df["date"] == "01-03-2022").all())
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_extract_dates_from_images_fills_all_rows(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            csv_path = os.path.join(tmpdir, "losses.csv")
+            df = make_df(12)
+            df.loc[5, "link_type"] = "twitter"  # not an OCR row
+            with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash",
+                                   side_effect=lambda url: (None, None) if url.endswith("/3.jpg") else fake_load(url)), \
+                 mock.patch.object(extract_dates_from_images, "extract_dates_and_tiers_from_image_batch", fake_batch_ocr("01-03-2022")):
+                df = run_ocr(df, csv_path=csv_path, download_threads=3, prefetch_depth=4, ocr_cache_path=None)
+            self.assertEqual(df.loc[3, "date"], "NO_DATE_FOUND")
+            self.assertEqual(df.loc[5, "date"], "")
+            self.assertEqual((df["date"] == "01-03-2022").sum(), 10)
+            self.assertTrue(os.path.exists(csv_path))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestOcrWorkerPool(unittest.TestCase):
+
+    def test_torch_threads_are_split_over_workers(self):
+        with mock.patch.dict(os.environ, {"OMP_NUM_THREADS": "8"}):
+            self.assertEqual(torch_threads_per_worker(2), 4)
+            self.assertEqual(torch_threads_per_worker(3), 2)
+            self.assertEqual(torch_threads_per_worker(16), 1)
+
+    def test_ocr_runs_in_worker_processes(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            csv_path = os.path.join(tmpdir, "losses.csv")
+            # OCR is mocked, so the workers need no EasyOCR Reader
+            with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=fake_load), \
+                 mock.patch.object(extract_dates_from_images, "ocr_image_batch", ocr_in_worker), \
+                 mock.patch.object(ocr_pool, "WARM_UP_READER", False):
+                df = run_ocr(make_df(9), csv_path=csv_path, batch_size=4, ocr_cache_path=None, ocr_workers=2)
+            self.assertFalse((df["date"] == "").any())
+            self.assertNotIn(str(os.getpid()), set(df["date"]))
+            self.assertEqual(len(pd.read_csv(csv_path)), 9)
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestOcrResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "ocr.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_roundtrip_including_no_date(self):
+        cache = OcrResultCache(self.path, version="1")
+        self.assertEqual(cache.get("abc"), (False, None))
+        cache.put("abc", "14-06-2022")
+        cache.put("def", None)
+        self.assertEqual(cache.get("abc"), (True, "14-06-2022"))
+        self.assertEqual(cache.get("def"), (True, None))
+        cache.close()
+
+    def test_new_version_invalidates_results(self):
+        cache = OcrResultCache(self.path, version="1")
+        cache.put("abc", "14-06-2022")
+        cache.close()
+        cache = OcrResultCache(self.path, version="2")
+        self.assertEqual(cache.get("abc"), (False, None))
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+    def test_variants_of_the_current_version_are_kept(self):
+        cache = OcrResultCache(self.path, version="4")
+        cache.put("old", "14-06-2022")  # an older base version, pruned below
+        cache.close()
+        cache = OcrResultCache(self.path, version="5")
+        cache.put("abc", "14-06-2022")
+        cache.close()
+        cache = OcrResultCache(self.path, version="5-gray")
+        cache.put("abc", None)
+        cache.close()
+        cache = OcrResultCache(self.path, version="5")
+        self.assertEqual(cache.get("abc"), (True, "14-06-2022"))
+        self.assertEqual(len(cache), 2)
+        cache.close()
+        cache = OcrResultCache(self.path, version="50")
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+    def test_results_are_checked_against_the_current_window(self):
+        cache = OcrResultCache(self.path, version="5")
+        cache.put("abc", "14-06-2022")
+        cache.put("def", None)
+        configure_date_window(date(2022, 1, 1), date(2030, 12, 31))
+        cache.put("ghi", None)
+        try:
+            # A new year widens the window: the rows are kept, but "no date" from the narrower window is re-OCR'd
+            self.assertEqual(cache.get("abc"), (True, "14-06-2022"))
+            self.assertEqual(cache.get("def"), (False, None))
+            self.assertEqual(cache.get("ghi"), (True, None))
+            configure_date_window(date(2023, 1, 1), date(2030, 12, 31))
+            self.assertEqual(cache.get("abc"), (False, None))
+            self.assertEqual(cache.get("ghi"), (True, None))
+        finally:
+            configure_date_window(*DEFAULT_DATE_WINDOW)
+        self.assertEqual(len(cache), 3)
+        cache.close()
+
+    def test_same_image_bytes_skip_ocr_across_runs(self):
+        csv_path = os.path.join(self.tmpdir, "losses.csv")
+        same_bytes = lambda url: ("same-sha", url)
+        with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=same_bytes), \
+             mock.patch.object(extract_dates_from_images, "extract_dates_and_tiers_from_image_batch", fake_batch_ocr("01-03-2022")) as ocr:
+            df = run_ocr(make_df(3), csv_path=csv_path, ocr_cache_path=self.path)
+            run_ocr(make_df(3), csv_path=csv_path, ocr_cache_path=self.path)
+        self.assertEqual(ocr.call_count, 1)
+        self.assertTrue((df["date"] == "01-03-2022").all())
+
+
+class TestOcrJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, "losses.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_truncated_last_line_is_skipped(self):
+        path = journal_path_for(self.csv_path)
+        journal = OcrJournal(path)
+        journal.append("https://i.postimg.cc/0.jpg", "01-03-2022")
+        journal.append("https://i.postimg.cc/1.jpg", None)
+        journal.close()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"link": "https://i.postimg.cc/2.jp')
+        self.assertEqual(load_ocr_journal(path), {
+            "https://i.postimg.cc/0.jpg": "01-03-2022",
+            "https://i.postimg.cc/1.jpg": None,
+        })
+
+    def test_csv_written_once_and_journal_removed(self):
+        with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=fake_load), \
+             mock.patch.object(extract_dates_from_images, "extract_dates_and_tiers_from_image_batch", fake_batch_ocr("01-03-2022")), \
+             mock.patch.object(pd.DataFrame, "to_csv") as to_csv:
+            run_ocr(make_df(25), csv_path=self.csv_path, batch_size=5, ocr_cache_path=None)
+        self.assertEqual(to_csv.call_count, 1)
+        self.assertFalse(os.path.exists(journal_path_for(self.csv_path)))
+
+    def test_interrupted_run_resumes_from_journal(self):
+        def crash_on_link_4(url):
+            if url.endswith("/4.jpg"):
+                raise KeyboardInterrupt
+            return fake_load(url)
+
+        with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=crash_on_link_4), \
+             mock.patch.object(extract_dates_from_images, "extract_dates_and_tiers_from_image_batch", fake_batch_ocr("01-03-2022")):
+            with self.assertRaises(KeyboardInterrupt):
+                run_ocr(make_df(6), csv_path=self.csv_path, download_threads=0, ocr_cache_path=None)
+        self.assertFalse(os.path.exists(self.csv_path))
+        self.assertEqual(len(load_ocr_journal(journal_path_for(self.csv_path))), 4)
+
+        with mock.patch.object(extract_dates_from_images, "load_postimg_array_with_hash", side_effect=fake_load) as load, \
+             mock.patch.object(extract_dates_from_images, "extract_dates_and_tiers_from_image_batch", fake_batch_ocr("02-03-2022")):
+            df = run_ocr(make_df(6), csv_path=self.csv_path, download_threads=0, ocr_cache_path=None)
+        self.assertEqual([call.args[0] for call in load.call_args_list],
+                         ["https://i.postimg.cc/4.jpg", "https://i.postimg.cc/5.jpg"])
+        self.assertEqual(list(df["date"]), ["01-03-2022"] * 4 + ["02-03-2022"] * 2)
+        self.assertEqual(list(pd.read_csv(self.csv_path)["date"]), list(df["date"]))
+        self.assertFalse(os.path.exists(journal_path_for(self.csv_path)))
+
+    def test_journal_does_not_override_manual_dates(self):
+        df = make_df(2)
+        df.loc[0, "date"] = "05-05-2023"
+        entries = {"https://i.postimg.cc/0.jpg": "01-03-2022", "https://i.postimg.cc/1.jpg": None}
+        self.assertEqual(extract_dates_from_images.replay_ocr_journal(df, entries), 1)
+        self.assertEqual(list(df["date"]), ["05-05-2023", "NO_DATE_FOUND"])
+
+    def test_manually_changed_rows_are_never_ocrd(self):
+        df = make_df(3)
+        df["date"] = ["", "NO_DATE_FOUND", "NO_DATE_FOUND"]
+        df.loc[2, "manually_changed"] = True
+        rows = extract_dates_from_images.rows_needing_ocr
+        self.assertEqual(list(rows(df).index), [0])
+        self.assertEqual(list(rows(df, retry_only_no_date=True).index), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,13 @@
 import unittest
 import os
-from html_parser import parse_li_item, parse_oryx_html  # import your functions
+import json
+import shutil
+import tempfile
+from html_parser import classify_link, parse_li_item, parse_li_item_lxml, parse_oryx_html  # import your functions
+from write_csv import write_losses_csv
 from bs4 import BeautifulSoup
+import lxml.html
+import pandas as pd
 
 class TestOryxParser(unittest.TestCase):
 
@@ -50,7 +56,118 @@ class TestOryxParser(unittest.TestCase):
         file = os.path.join(os.path.dirname(__file__), "test_snippet.html")
         losses = parse_oryx_html(file, start_category="Tanks")
         self.assertEqual(len(losses), 1)
-        self.assertEqual(losses[0]["equipment_type"], "T-62")
+        self.assertEqual(losses["equipment_type"].iloc[0], "T-62")
+
+    def test_classify_link(self):
+        self.assertEqual(classify_link("https://i.postimg.cc/1032.jpg"), "postimg")
+        self.assertEqual(classify_link("https://X.com/user/status/1"), "twitter")
+        self.assertEqual(classify_link("https://i.imgur.com/a.jpg?x=postimg.cc"), "imgur")
+        self.assertEqual(classify_link("//i.postimg.cc/1032.jpg"), "postimg")
+        self.assertEqual(classify_link(""), "other")
+
+    def test_parse_li_item_lxml_matches_bs4(self):
+        html = '<li>4 T-55A: <a href="https://i.postimg.cc/1009.jpg">(2, 3, 4 and 5, damaged)</a></li>'
+        li_bs4 = BeautifulSoup(html, "lxml").li
+        li_lxml = lxml.html.fragment_fromstring(html)
+        self.assertEqual(parse_li_item_lxml(li_lxml, category="Tanks").rows(),
+                         parse_li_item(li_bs4, category="Tanks").rows())
+
+    def test_parse_html_unknown_engine(self):
+        file = os.path.join(os.path.dirname(__file__), "test_snippet.html")
+        with self.assertRaises(ValueError):
+            parse_oryx_html(file, engine="regex")
+
+
+class TestParserEngineParity(unittest.TestCase):
+    """The lxml engine must emit exactly the same rows as the BeautifulSoup engine."""
+
+    def assert_engines_match(self, filename):
+        file = os.path.join(os.path.dirname(os.path.dirname(__file__)), filename)
+        bs4_losses = parse_oryx_html(file, engine="bs4")
+        lxml_losses = parse_oryx_html(file, engine="lxml")
+        self.assertEqual(len(lxml_losses), len(bs4_losses))
+        pd.testing.assert_frame_equal(lxml_losses, bs4_losses)
+
+    def test_snippet(self):
+        self.assert_engines_match(os.path.join("tests", "test_snippet.html"))
+
+    def test_russian_snapshot(self):
+        self.assert_engines_match("russian_losses.html")
+
+    def test_ukrainian_snapshot(self):
+        self.assert_engines_match("ukrainian_losses.html")
+
+
+class TestSectionCache(unittest.TestCase):
+    """Unchanged category sections are served from the cache, changed ones are reparsed."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.html = os.path.join(self.tmpdir, "snippet.html")
+        self.cache = os.path.join(self.tmpdir, "sections.json")
+        shutil.copy(os.path.join(os.path.dirname(__file__), "test_snippet.html"), self.html)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def tamper_cached_rows(self):
+        """Replace the cached equipment type so reuse is observable in the output."""
+        with open(self.cache, encoding="utf-8") as f:
+            cache = json.load(f)
+        cache["sections"]["Tanks"]["rows"][0][0] = "FROM_CACHE"
+        with open(self.cache, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+
+    def test_cache_matches_full_parse(self):
+        for engine in ("bs4", "lxml"):
+            expected = parse_oryx_html(self.html, engine=engine)
+            first = parse_oryx_html(self.html, engine=engine, section_cache=self.cache)
+            second = parse_oryx_html(self.html, engine=engine, section_cache=self.cache)
+            pd.testing.assert_frame_equal(first, expected)
+            pd.testing.assert_frame_equal(second, expected)
+
+    def test_write_losses_csv(self):
+        path = os.path.join(self.tmpdir, "recent.csv")
+        write_losses_csv(parse_oryx_html(self.html, engine="lxml"), filename=path)
+        with open(path, newline="", encoding="utf-8") as f:
+            lines = f.read().split("\r\n")
+        self.assertEqual(lines[0], "equipment_type,category,loss_type,link_type,link,date,manually_changed")
+        self.assertTrue(lines[1].startswith("T-62,Tanks,destroyed,postimg,https://"))
+        self.assertTrue(lines[1].endswith(",,False"))
+
+    def test_unchanged_section_is_reused(self):
+        parse_oryx_html(self.html, engine="lxml", section_cache=self.cache)
+        self.tamper_cached_rows()
+        losses = parse_oryx_html(self.html, engine="lxml", section_cache=self.cache)
+        self.assertEqual(losses["equipment_type"].iloc[0], "FROM_CACHE")
+
+    def test_changed_header_count_is_reparsed(self):
+        parse_oryx_html(self.html, engine="lxml", section_cache=self.cache)
+        self.tamper_cached_rows()
+        with open(self.html, encoding="utf-8") as f:
+            html = f.read()
+        with open(self.html, "w", encoding="utf-8") as f:
+            f.write(html.replace("Tanks (50)", "Tanks (51)"))
+        losses = parse_oryx_html(self.html, engine="lxml", section_cache=self.cache)
+        self.assertEqual(losses["equipment_type"].iloc[0], "T-62")
+
+    def test_changed_section_content_is_reparsed(self):
+        parse_oryx_html(self.html, engine="lxml", section_cache=self.cache)
+        self.tamper_cached_rows()
+        with open(self.html, encoding="utf-8") as f:
+            html = f.read()
+        with open(self.html, "w", encoding="utf-8") as f:
+            f.write(html.replace('abcd.jpg">(1, destroyed)</a>',
+                                 'abcd.jpg">(1, destroyed)</a> <a href="https://i.postimg.cc/x.jpg">(2, damaged)</a>'))
+        losses = parse_oryx_html(self.html, engine="lxml", section_cache=self.cache)
+        self.assertEqual(list(losses["equipment_type"]), ["T-62", "T-62"])
+
+    def test_cache_from_other_engine_is_ignored(self):
+        parse_oryx_html(self.html, engine="bs4", section_cache=self.cache)
+        self.tamper_cached_rows()
+        losses = parse_oryx_html(self.html, engine="lxml", section_cache=self.cache)
+        self.assertEqual(losses["equipment_type"].iloc[0], "T-62")
+
 
 if __name__ == "__main__":
     unittest.main()
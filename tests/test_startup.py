@@ -0,0 +1,30 @@
+import unittest
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_heavy_modules(code):
+    """Run code in a fresh interpreter and return which of torch / cv2 / easyocr it imported."""
+    check = "import sys; print(','.join(m for m in ('torch', 'cv2', 'easyocr') if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}\n{check}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+
+
+class TestLazyOcrImports(unittest.TestCase):
+
+    def test_import_main_loads_no_ocr_stack(self):
+        self.assertEqual(loaded_heavy_modules("import main"), "")
+
+    def test_ocr_module_defers_reader(self):
+        code = "import date_extracting_from_image_using_OCR as ocr\nassert ocr.reader is None"
+        self.assertEqual(loaded_heavy_modules(code), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest import mock
+import pandas as pd
+from extract_dates_from_twitter import extract_dates_from_twitter, snowflake_to_date
+
+
+def twitter_df(links, dates=None, manual=None):
+    return pd.DataFrame({
+        "link_type": ["twitter"] * len(links),
+        "link": links,
+        "date": dates or [None] * len(links),
+        "manually_changed": manual or [False] * len(links),
+    })
+
+
+class TestTwitterDates(unittest.TestCase):
+
+    def test_vectorized_matches_scalar(self):
+        links = [
+            "https://twitter.com/UAWeapons/status/1507012290536566788",
+            "https://x.com/someone/status/1744000000000000000  ",
+            "https://twitter.com/someone/status/1509881676180172810/photo/1",
+        ]
+        df = extract_dates_from_twitter(twitter_df(links), logger=mock.Mock())
+        self.assertEqual(list(df["date"]), [
+            snowflake_to_date("1507012290536566788"),
+            snowflake_to_date("1744000000000000000"),
+            snowflake_to_date("1509881676180172810"),
+        ])
+        self.assertEqual(df["date"].iloc[0], "24-03-2022")
+
+    def test_only_missing_unmanual_dates_are_filled(self):
+        link = "https://twitter.com/UAWeapons/status/1507012290536566788"
+        df = twitter_df([link] * 3, dates=[None, "01-01-2023", None], manual=[False, False, True])
+        df = extract_dates_from_twitter(df, logger=mock.Mock())
+        self.assertEqual(df["date"].iloc[0], "24-03-2022")
+        self.assertEqual(df["date"].iloc[1], "01-01-2023")
+        self.assertTrue(pd.isna(df["date"].iloc[2]))
+
+    def test_pic_twitter_links_are_a_separate_bucket(self):
+        logger = mock.Mock()
+        df = twitter_df(["https://pic.twitter.com/a9BoN1E03K", "https://twitter.com/UAWeapons"])
+        df = extract_dates_from_twitter(df, logger=logger)
+        self.assertTrue(df["date"].isna().all())
+        messages = [call.args[0] for call in logger.info.call_args_list]
+        self.assertIn("pic.twitter.com short links (no tweet id to date): 1", messages[0])
+        self.assertEqual(messages[1], "[1] No tweet id in https://twitter.com/UAWeapons")
+
+
+if __name__ == "__main__":
+    unittest.main()
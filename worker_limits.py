@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+# Shared limits for running several dataset pipelines at the same time.
+# main.py creates the semaphore once and hands it to every worker process through
+# init_worker, so all workers draw from the same HTTP budget.
+HTTP_SLOTS = None
+# Whether the current thread holds a slot, so a retry can give it back while it backs off
+slot_state = threading.local()
+
+# Environment variables read by torch / OpenMP / MKL when sizing their thread pools
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def cpu_threads_per_job(jobs):
+    """Split the available CPUs evenly over the concurrent jobs (at least 1 each)."""
+    return max(1, (os.cpu_count() or 1) // max(1, jobs))
+
+
+def cpu_budget():
+    """CPUs this process may use: its OMP_NUM_THREADS cap if set (e.g. by init_worker), else all CPUs."""
+    try:
+        return max(1, int(os.environ["OMP_NUM_THREADS"]))
+    except (KeyError, ValueError):
+        return os.cpu_count() or 1
+
+
+def limit_cpu_threads(threads):
+    """Cap the intra-op threads torch (EasyOCR) may use in this process."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    # torch reads OMP_NUM_THREADS when it is first imported; only an already
+    # loaded torch needs to be told. Importing it here would defeat lazy loading.
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def init_worker(cpu_threads, http_slots=None):
+    """ProcessPoolExecutor initializer: apply the CPU share and the shared HTTP budget."""
+    global HTTP_SLOTS
+    HTTP_SLOTS = http_slots
+    limit_cpu_threads(cpu_threads)
+
+
+@contextmanager
+def http_slot():
+    """Hold one slot of the shared HTTP budget for the duration of a request."""
+    if HTTP_SLOTS is None or getattr(slot_state, "held", False):
+        yield
+        return
+    with HTTP_SLOTS:
+        slot_state.held = True
+        try:
+            yield
+        finally:
+            slot_state.held = False
+
+
+@contextmanager
+def http_slot_released():
+    """Give the slot this thread holds back to the budget for a while, e.g. during a retry backoff."""
+    if HTTP_SLOTS is None or not getattr(slot_state, "held", False):
+        yield
+        return
+    slot_state.held = False
+    HTTP_SLOTS.release()
+    try:
+        yield
+    finally:
+        HTTP_SLOTS.acquire()
+        slot_state.held = True
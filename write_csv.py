@@ -1,22 +1,13 @@
-import csv
+# Columns of the most recent losses CSV, the input of the merge
+CSV_COLUMNS = ["equipment_type", "category", "loss_type", "link_type", "link", "date", "manually_changed"]
 
 def write_losses_csv(losses, filename="most_recent_losses.csv"):
-    """Write a list of loss dictionaries to a CSV file.
+    """Write the losses DataFrame from parse_oryx_html to a CSV file.
     Always includes 'manually_changed' column set to False by default.
     """
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "equipment_type", "category", "loss_type",
-            "link_type", "link", "date", "manually_changed"
-        ])
-        for loss in losses:
-            writer.writerow([
-                loss["equipment_type"],
-                loss["category"],
-                loss["loss_type"],
-                loss["link_type"],
-                loss["link"],
-                loss.get("date", ""),
-                False 
-            ])
+    if "date" not in losses.columns:
+        losses = losses.assign(date="")
+    # Same layout and '\r\n' line endings as the csv module wrote before
+    losses.assign(manually_changed=False)[CSV_COLUMNS].to_csv(
+        filename, index=False, encoding="utf-8", lineterminator="\r\n"
+    )